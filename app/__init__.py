@@ -1,28 +1,48 @@
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
-from flask_migrate import Migrate
 from flask_login import LoginManager
 from flask_wtf.csrf import CSRFProtect
 
-
-app = Flask(__name__)
-app.config.from_object('config.Config')
-csrf = CSRFProtect(app)
-
-db = SQLAlchemy(app)
-migrate = Migrate(app, db)  # Add this line
-
-login_manager = LoginManager(app)
+# Extensions are created unbound and attached to each app in create_app, so that
+# importing the package (CLI, migrations, tests) doesn't build an app.
+db = SQLAlchemy()
+csrf = CSRFProtect()
+login_manager = LoginManager()
 login_manager.login_view = 'auth.login'
 
-from app.models import User  # Ensure this import is after db initialization
-
-@login_manager.user_loader
-def load_user(user_id):
-    return User.query.get(int(user_id))
-
-from app.views import main as main_blueprint
-from app.auth import auth as auth_blueprint
 
-app.register_blueprint(main_blueprint)
-app.register_blueprint(auth_blueprint)
+def create_app(config='config.Config'):
+    """Build an app from ``config``, a config object or its import path (e.g. ``'config.TestConfig'``)."""
+    app = Flask(__name__)
+    app.config.from_object(config)
+
+    db.init_app(app)
+    csrf.init_app(app)
+    login_manager.init_app(app)
+    if app.config.get('MIGRATIONS_ENABLED', True):
+        # Alembic is the slowest import of all; tests building their schema with create_all skip it.
+        from flask_migrate import Migrate
+        Migrate(app, db)
+
+    from app.views import main as main_blueprint
+    from app.auth import auth as auth_blueprint
+    app.register_blueprint(main_blueprint)
+    app.register_blueprint(auth_blueprint)
+
+    from app import choices, database, deadlines, events, notifications, perf, retention, scheduler, search, users
+    login_manager.user_loader(users.load_user)
+    database.init_app(app)
+    events.init_app(app)
+    notifications.init_app(app)
+    search.init_app(app)
+    users.init_app(app)
+    choices.init_app(app)
+    perf.init_app(app)
+    scheduler.init_app(app)
+    retention.init_app(app)
+    deadlines.init_app(app)
+    scheduler.start(app)
+
+    from app.commands import register_commands
+    register_commands(app)
+    return app
@@ -0,0 +1,156 @@
+"""Vectorized engagement analytics over the ``Metric`` table.
+
+Only the date range is filtered in SQL (on the indexed ``posted_on``
+column); the matching rows are then loaded once into NumPy arrays and
+every aggregate is computed column-wise, without a Python loop per post.
+
+Engagement is ``likes + comments + shares``; the engagement rate is
+engagement divided by views. Rolling averages are taken over calendar
+days, so days without posts count as zero.
+"""
+from datetime import date
+import numpy as np
+from sqlalchemy import select
+from app import db
+from app.models import Metric
+
+ROLLING_WINDOWS = (7, 30)
+GROWTH_WINDOWS = (7, 30)
+
+
+class MetricArrays:
+    def __init__(self, rows):
+        columns = list(zip(*rows)) if rows else [()] * 8
+        self.ids = np.array(columns[0], dtype=np.int64)
+        self.client_ids = np.array(columns[1], dtype=np.int64)
+        self.platforms = np.array(columns[2], dtype=object)
+        self.days = np.array([day if isinstance(day, int) else day.toordinal() for day in columns[3]], dtype=np.int64)
+        self.views = np.array(columns[4], dtype=np.float64)
+        self.engagement = (np.array(columns[5], dtype=np.float64) + np.array(columns[6], dtype=np.float64)
+                           + np.array(columns[7], dtype=np.float64))
+
+    def __len__(self):
+        return len(self.ids)
+
+
+def _day_number(connection):
+    # Parsing a date object per row dominates the load time on SQLite, so let it
+    # return proleptic ordinals (date.toordinal) directly.
+    if connection.dialect.name == 'sqlite':
+        return db.cast(db.func.julianday(Metric.posted_on) - 1721424.5, db.Integer)
+    return Metric.posted_on
+
+
+def load_metrics(client_id=None, start=None, end=None):
+    connection = db.session.connection()
+    statement = select(
+        Metric.id, Metric.client_id, Metric.platform, _day_number(connection),
+        db.func.coalesce(Metric.views, 0), db.func.coalesce(Metric.likes, 0),
+        db.func.coalesce(Metric.comments, 0), db.func.coalesce(Metric.shares, 0),
+    ).where(Metric.posted_on.isnot(None))
+    if client_id is not None:
+        statement = statement.where(Metric.client_id == client_id)
+    if start is not None:
+        statement = statement.where(Metric.posted_on >= start)
+    if end is not None:
+        statement = statement.where(Metric.posted_on <= end)
+    return MetricArrays(connection.execute(statement).all())
+
+
+def _rate(engagement, views):
+    return np.divide(engagement, views, out=np.zeros_like(engagement, dtype=np.float64), where=views > 0)
+
+
+def _rolling_sum(values, window):
+    totals = np.cumsum(values)
+    totals[window:] = totals[window:] - totals[:-window]
+    return totals
+
+
+def platform_totals(metrics):
+    if not len(metrics):
+        return []
+    platforms, inverse = np.unique(metrics.platforms.astype(str), return_inverse=True)
+    posts = np.bincount(inverse, minlength=len(platforms))
+    views = np.bincount(inverse, weights=metrics.views, minlength=len(platforms))
+    engagement = np.bincount(inverse, weights=metrics.engagement, minlength=len(platforms))
+    rates = _rate(engagement, views)
+    return [
+        {'platform': platform, 'posts': int(posts[i]), 'views': int(views[i]),
+         'engagement': int(engagement[i]), 'engagement_rate': float(rates[i])}
+        for i, platform in enumerate(platforms)
+    ]
+
+
+def daily_series(metrics):
+    """Per-day totals with rolling averages over ``ROLLING_WINDOWS`` days."""
+    if not len(metrics):
+        return []
+    first_day = metrics.days.min()
+    offsets = metrics.days - first_day
+    length = int(offsets.max()) + 1
+    views = np.bincount(offsets, weights=metrics.views, minlength=length)
+    engagement = np.bincount(offsets, weights=metrics.engagement, minlength=length)
+    columns = {'views': views, 'engagement': engagement, 'engagement_rate': _rate(engagement, views)}
+    for window in ROLLING_WINDOWS:
+        rolling_views = _rolling_sum(views, window)
+        rolling_engagement = _rolling_sum(engagement, window)
+        # The first days of the range have fewer than `window` days behind them.
+        span = np.minimum(np.arange(1, length + 1), window)
+        columns[f'views_{window}d_avg'] = rolling_views / span
+        columns[f'engagement_{window}d_avg'] = rolling_engagement / span
+        columns[f'engagement_rate_{window}d'] = _rate(rolling_engagement, rolling_views)
+    return [
+        dict({'date': date.fromordinal(int(first_day) + offset).isoformat()},
+             **{name: float(values[offset]) for name, values in columns.items()})
+        for offset in range(length)
+    ]
+
+
+def growth(metrics, as_of=None):
+    """Views and engagement of the last N days against the N days before, for each window."""
+    as_of = (as_of or date.today()).toordinal()
+    result = {}
+    for window in GROWTH_WINDOWS:
+        age = as_of - metrics.days
+        current = (age >= 0) & (age < window)
+        previous = (age >= window) & (age < 2 * window)
+        entry = {}
+        for name, values in (('views', metrics.views), ('engagement', metrics.engagement)):
+            now, before = values[current].sum(), values[previous].sum()
+            entry[name] = int(now)
+            entry[f'{name}_previous'] = int(before)
+            entry[f'{name}_growth'] = float((now - before) / before) if before else None
+        result[f'{window}d'] = entry
+    return result
+
+
+def top_posts(metrics, n=10):
+    if not len(metrics):
+        return []
+    n = min(n, len(metrics))
+    candidates = np.argpartition(-metrics.engagement, n - 1)[:n]
+    order = candidates[np.argsort(-metrics.engagement[candidates], kind='stable')]
+    rates = _rate(metrics.engagement[order], metrics.views[order])
+    return [
+        {'id': int(metrics.ids[i]), 'client_id': int(metrics.client_ids[i]), 'platform': metrics.platforms[i],
+         'date': date.fromordinal(int(metrics.days[i])).isoformat(), 'views': int(metrics.views[i]),
+         'engagement': int(metrics.engagement[i]), 'engagement_rate': float(rate)}
+        for i, rate in zip(order, rates)
+    ]
+
+
+def client_analytics(client_id=None, start=None, end=None, top=10, as_of=None):
+    metrics = load_metrics(client_id, start, end)
+    views, engagement = metrics.views.sum(), metrics.engagement.sum()
+    return {
+        'client_id': client_id,
+        'start': start.isoformat() if start else None,
+        'end': end.isoformat() if end else None,
+        'totals': {'posts': len(metrics), 'views': int(views), 'engagement': int(engagement),
+                   'engagement_rate': float(engagement / views) if views else 0.0},
+        'platforms': platform_totals(metrics),
+        'growth': growth(metrics, as_of=as_of or end),
+        'top_posts': top_posts(metrics, top),
+        'daily': daily_series(metrics),
+    }
@@ -0,0 +1,115 @@
+"""Small key/value caches used to keep hot counters and lookups off the database.
+
+``TTLCache`` is the in-process default: a thread-safe LRU whose entries also
+expire after ``ttl`` seconds. Deployments that run several worker processes
+can point a counter cache at a shared backend instead (see ``make_cache``),
+as long as it offers the same ``get``/``set``/``incr``/``delete``/``clear``
+methods.
+"""
+import threading
+import time
+from collections import OrderedDict
+from importlib import import_module
+
+
+class TTLCache:
+    def __init__(self, maxsize=10000, ttl=300, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _live(self, key):
+        # Caller holds the lock.
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        if entry[1] <= self._clock():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return entry
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._live(key)
+            return default if entry is None else entry[0]
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (value, self._clock() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def incr(self, key, delta=1):
+        """Add ``delta`` to a cached number; returns the new value, or ``None`` if not cached."""
+        with self._lock:
+            entry = self._live(key)
+            if entry is None:
+                return None
+            value = entry[0] + delta
+            self._data[key] = (value, entry[1])
+            return value
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class RedisCache:
+    """Shared counter backend for multi-process deployments; needs the optional ``redis`` package."""
+
+    # INCRBY would create a missing key, so only bump keys that are already cached.
+    _INCR_EXISTING = "if redis.call('exists', KEYS[1]) == 1 then return redis.call('incrby', KEYS[1], ARGV[1]) end return nil"
+
+    def __init__(self, url, prefix='', ttl=300):
+        import redis
+        self._redis = redis.Redis.from_url(url)
+        self._incr = self._redis.register_script(self._INCR_EXISTING)
+        self.prefix = prefix
+        self.ttl = ttl
+
+    def _key(self, key):
+        return f'{self.prefix}{key}'
+
+    def get(self, key, default=None):
+        value = self._redis.get(self._key(key))
+        return default if value is None else int(value)
+
+    def set(self, key, value):
+        self._redis.set(self._key(key), value, ex=self.ttl)
+
+    def incr(self, key, delta=1):
+        return self._incr(keys=[self._key(key)], args=[delta])
+
+    def delete(self, key):
+        self._redis.delete(self._key(key))
+
+    def clear(self):
+        keys = list(self._redis.scan_iter(match=f'{self.prefix}*'))
+        if keys:
+            self._redis.delete(*keys)
+
+
+def make_cache(backend=None, prefix='', maxsize=10000, ttl=300):
+    """Build a cache from a config value.
+
+    ``None`` gives an in-process ``TTLCache``, a ``redis://`` URL gives a
+    ``RedisCache`` and ``'package.module:factory'`` calls ``factory(prefix=...,
+    ttl=...)`` for any other shared store.
+    """
+    if not backend:
+        return TTLCache(maxsize=maxsize, ttl=ttl)
+    if backend.startswith(('redis://', 'rediss://', 'unix://')):
+        return RedisCache(backend, prefix=prefix, ttl=ttl)
+    module_name, _, factory = backend.partition(':')
+    return getattr(import_module(module_name), factory)(prefix=prefix, ttl=ttl)
@@ -0,0 +1,97 @@
+"""Cached choice lists for the task assignment form and its typeahead.
+
+``options(kind)`` is ``{id: label}`` for every worker or every client,
+read once and then served from a ``TTLCache``; ``search`` filters it for
+the typeahead endpoint and the form validates ids against it, so neither
+rendering nor submitting the form reads the user or client table.
+
+Inserting, updating or deleting a user or client drops that list once the
+transaction commits. Other processes pick the change up after at most
+``CHOICES_CACHE_TTL`` seconds.
+"""
+from flask import current_app, has_app_context
+from sqlalchemy import event, select
+from sqlalchemy.orm import object_session
+from app import db
+from app.cache import TTLCache
+from app.models import Client, User
+
+_CHANGED_KEY = 'changed_choices'
+
+SOURCES = {
+    'workers': (lambda: select(User.id, User.name, User.email).where(User.is_manager == False).order_by(User.name),
+                lambda row: f'{row.name} <{row.email}>'),
+    'clients': (lambda: select(Client.id, Client.name).order_by(Client.name),
+                lambda row: f'{row.name} (#{row.id})'),
+}
+_KINDS = {User: 'workers', Client: 'clients'}
+
+
+def init_app(app):
+    app.extensions['choices'] = TTLCache(maxsize=len(SOURCES), ttl=app.config.get('CHOICES_CACHE_TTL', 300))
+
+
+def _load(kind):
+    cache = current_app.extensions['choices']
+    loaded = cache.get(kind)
+    if loaded is None:
+        statement, label = SOURCES[kind]
+        labels = {row.id: label(row) for row in db.session.execute(statement())}
+        loaded = (labels, [(text.lower(), id) for id, text in labels.items()])
+        cache.set(kind, loaded)
+    return loaded
+
+
+def options(kind):
+    """``{id: label}`` for ``kind`` ('workers' or 'clients'), in label order."""
+    return _load(kind)[0]
+
+
+def label(kind, id):
+    return options(kind).get(id)
+
+
+def search(kind, query, limit=20):
+    """Up to ``limit`` ``(id, label)`` whose label contains ``query``, those starting with it first."""
+    labels, lowered = _load(kind)
+    query = query.strip().lower()
+    starts, contains = [], []
+    for text, id in lowered:
+        if text.startswith(query):
+            starts.append(id)
+            if len(starts) >= limit:
+                break
+        elif query in text and len(contains) < limit:
+            contains.append(id)
+    return [(id, labels[id]) for id in (starts + contains)[:limit]]
+
+
+def invalidate(kind=None):
+    cache = current_app.extensions['choices']
+    if kind is None:
+        cache.clear()
+    else:
+        cache.delete(kind)
+
+
+@event.listens_for(User, 'after_insert')
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+@event.listens_for(Client, 'after_insert')
+@event.listens_for(Client, 'after_update')
+@event.listens_for(Client, 'after_delete')
+def _choices_changed(mapper, connection, target):
+    object_session(target).info.setdefault(_CHANGED_KEY, set()).add(_KINDS[mapper.class_])
+
+
+@event.listens_for(db.session, 'after_commit')
+def _invalidate_changed(session):
+    changed = session.info.pop(_CHANGED_KEY, None)
+    if changed and has_app_context():
+        for kind in changed:
+            invalidate(kind)
+
+
+@event.listens_for(db.session, 'after_soft_rollback')
+def _discard_changed(session, previous_transaction):
+    session.info.pop(_CHANGED_KEY, None)
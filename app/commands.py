@@ -0,0 +1,168 @@
+import click
+from flask.cli import with_appcontext
+
+
+@click.command('rebuild-counters')
+@with_appcontext
+def rebuild_counters_command():
+    """Recompute the dashboard counters from the task and client tables."""
+    from app.counters import rebuild_counters
+    rows = rebuild_counters()
+    click.echo(f'Rebuilt {rows} dashboard counter rows.')
+
+
+@click.command('check-query-plans')
+@with_appcontext
+def check_query_plans_command():
+    """Fail if any hot view query does a full table scan on SQLite."""
+    from app import db
+    from app.query_plans import check_query_plans
+    if db.engine.dialect.name != 'sqlite':
+        raise click.ClickException('check-query-plans needs a SQLite database.')
+    plans, offenders = check_query_plans()
+    for name, plan in plans.items():
+        marker = 'FULL SCAN' if name in offenders else 'ok'
+        click.echo(f'{marker:9} {name}: {"; ".join(plan)}')
+    if offenders:
+        raise click.ClickException(f'{len(offenders)} queries scan a whole table.')
+
+
+@click.command('drain-notification-outbox')
+@with_appcontext
+def drain_notification_outbox_command():
+    """Deliver every notification event still waiting in the outbox."""
+    from app.notifications import drain_outbox
+    drain_outbox()
+    click.echo('Notification outbox drained.')
+
+
+@click.command('prune-notifications')
+@click.option('--retention-days', type=int, help='Archive read notifications older than this (default NOTIFICATION_RETENTION_DAYS).')
+@click.option('--digest-days', type=int, help='Digest unread notifications older than this (default NOTIFICATION_DIGEST_DAYS).')
+@click.option('--mode', type=click.Choice(['archive', 'delete']), help='Default NOTIFICATION_RETENTION_MODE.')
+@with_appcontext
+def prune_notifications_command(retention_days, digest_days, mode):
+    """Archive old read notifications and collapse old unread ones into digests, in small batches."""
+    from app.retention import prune_notifications
+    result = prune_notifications(retention_days=retention_days, digest_days=digest_days, mode=mode)
+    click.echo(f'Removed {result["removed"]} read notifications; '
+               f'collapsed {result["collapsed"]} unread ones into {result["digests"]} digests.')
+
+
+@click.command('check-deadlines')
+@with_appcontext
+def check_deadlines_command():
+    """Send the overdue and due-soon alerts for deadlines passed since the last check."""
+    from app.deadlines import check_deadlines
+    result = check_deadlines()
+    click.echo(f'{result["overdue"]} tasks became overdue, {result["due_soon"]} are due soon.')
+
+
+@click.command('run-scheduler')
+@with_appcontext
+def run_scheduler_command():
+    """Run the periodic jobs (notification retention, deadline alerts) in the foreground until interrupted."""
+    from flask import current_app
+    scheduler = current_app.extensions['scheduler']
+    click.echo(', '.join(f'{job.name} every {job.interval}s' for job in scheduler.jobs) or 'No jobs are enabled.')
+    try:
+        scheduler.run_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+@click.command('export-metrics')
+@click.argument('path', type=click.Path(dir_okay=False, writable=True))
+@click.option('--client-id', 'client_ids', type=int, multiple=True, help='Only export these clients (repeatable).')
+@with_appcontext
+def export_metrics_command(path, client_ids):
+    """Export metrics to a .csv or .parquet file."""
+    from app import db
+    from app.metrics_io import MetricFileError, export_csv, export_parquet
+    try:
+        chunks = export_parquet(db.engine, client_ids) if path.endswith('.parquet') else export_csv(db.engine, client_ids)
+        with open(path, 'wb') as output:
+            for chunk in chunks:
+                output.write(chunk)
+    except MetricFileError as error:
+        raise click.ClickException(str(error))
+    click.echo(f'Metrics written to {path}.')
+
+
+@click.command('import-metrics')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--batch-size', default=5000, show_default=True)
+@with_appcontext
+def import_metrics_command(path, batch_size):
+    """Validate and bulk-insert metrics from a .csv or .parquet file."""
+    from app import db
+    from app.metrics_io import MetricFileError, import_metrics, read_metrics
+    with open(path, 'rb') as stream:
+        try:
+            imported, skipped, errors = import_metrics(read_metrics(stream, path), batch_size)
+        except MetricFileError as error:
+            raise click.ClickException(str(error))
+    db.session.commit()
+    for row_number, message in errors:
+        click.echo(f'row {row_number}: {message}', err=True)
+    click.echo(f'Imported {imported} metrics, skipped {skipped} rows.')
+
+
+@click.command('rebuild-search-index')
+@with_appcontext
+def rebuild_search_index_command():
+    """Repopulate the full-text search index from the client, task and content idea tables."""
+    from app.search import backend, rebuild
+    documents = rebuild()
+    click.echo(f'Indexed {documents} documents ({backend()} backend).')
+
+
+@click.command('rebuild-reports')
+@with_appcontext
+def rebuild_reports_command():
+    """Recompute the submitted tasks report rollups and worker duration stats from the task table."""
+    from app.reports import rebuild_reports
+    tasks = rebuild_reports()
+    click.echo(f'Aggregated {tasks} completed tasks.')
+
+
+@click.command('generate-data')
+@click.option('--scale', type=float, default=1.0, help='Multiply every default volume, e.g. 0.01 for a quick run.')
+@click.option('--users', type=int)
+@click.option('--clients', type=int)
+@click.option('--tasks', type=int)
+@click.option('--onboarding-tasks', type=int)
+@click.option('--content-ideas', type=int)
+@click.option('--metrics', type=int)
+@click.option('--notifications', type=int)
+@click.option('--seed', type=int, default=1, show_default=True)
+@click.option('--batch-size', type=int, default=10000, show_default=True)
+@with_appcontext
+def generate_data_command(scale, seed, batch_size, **overrides):
+    """Fill an empty database with synthetic agency data for benchmarks."""
+    from app import db
+    from app.sample_data import DEFAULT_VOLUMES, PASSWORD, generate
+    volumes = {table: overrides[table] if overrides[table] is not None else max(1, int(count * scale))
+               for table, count in DEFAULT_VOLUMES.items()}
+    db.create_all()
+    try:
+        counts = generate(volumes, seed=seed, batch_size=batch_size,
+                          progress=lambda table, rows: click.echo(f'{table}: {rows} rows', err=True))
+    except ValueError as error:
+        raise click.ClickException(str(error))
+    click.echo(', '.join(f'{count} {table}' for table, count in counts.items()))
+    click.echo(f'Log in as manager1@example.com or worker1@example.com with password "{PASSWORD}".')
+
+
+def register_commands(app):
+    app.cli.add_command(rebuild_counters_command)
+    app.cli.add_command(check_query_plans_command)
+    app.cli.add_command(drain_notification_outbox_command)
+    app.cli.add_command(prune_notifications_command)
+    app.cli.add_command(check_deadlines_command)
+    app.cli.add_command(run_scheduler_command)
+    app.cli.add_command(export_metrics_command)
+    app.cli.add_command(import_metrics_command)
+    app.cli.add_command(rebuild_search_index_command)
+    app.cli.add_command(rebuild_reports_command)
+    app.cli.add_command(generate_data_command)
@@ -0,0 +1,103 @@
+"""Materialized dashboard counters.
+
+The dashboards read a single ``DashboardCounter`` row instead of counting
+the task and client tables on every page view. Every write path that
+changes a task's or a client's status records the change here in the same
+transaction, and ``rebuild_counters`` reconciles the table from scratch.
+The ``overdue`` column is kept by the deadline job, see app/deadlines.py.
+"""
+from sqlalchemy import case, func, insert, select, update
+from app import db
+from app.database import increment
+from app.models import Client, DashboardCounter, JobWatermark, Task
+
+GLOBAL = 0
+
+TASK_STATUS_COLUMNS = {
+    'Assigned': 'assigned',
+    'In Progress': 'in_progress',
+    'Completed': 'completed',
+}
+
+
+def _apply(scope, deltas):
+    increment(DashboardCounter, {'worker_id': scope}, deltas)
+
+
+def _status_deltas(old_status, new_status):
+    deltas = {}
+    if old_status in TASK_STATUS_COLUMNS:
+        deltas[TASK_STATUS_COLUMNS[old_status]] = -1
+    if new_status in TASK_STATUS_COLUMNS:
+        column = TASK_STATUS_COLUMNS[new_status]
+        deltas[column] = deltas.get(column, 0) + 1
+    return deltas
+
+
+def record_task_status(worker_id, old_status, new_status):
+    """Move one task from ``old_status`` to ``new_status`` (``None`` for a new task)."""
+    if old_status == new_status:
+        return
+    deltas = _status_deltas(old_status, new_status)
+    _apply(GLOBAL, deltas)
+    if worker_id:
+        _apply(worker_id, deltas)
+
+
+def record_client_status(old_status, new_status):
+    """Track the active-client total when a client is added or changes status."""
+    delta = (new_status == 'Active') - (old_status == 'Active')
+    _apply(GLOBAL, {'active_clients': delta})
+
+
+def record_overdue(worker_deltas):
+    """Add ``{worker_id: delta}`` to the overdue counters and their total."""
+    _apply(GLOBAL, {'overdue': sum(worker_deltas.values())})
+    for worker_id, delta in worker_deltas.items():
+        _apply(worker_id, {'overdue': delta})
+
+
+def _overdue_counts(cutoff):
+    return db.session.execute(
+        select(Task.worker_id, func.count()).where(Task.status.in_(('Assigned', 'In Progress')), Task.deadline <= cutoff)
+        .group_by(Task.worker_id)
+    ).all()
+
+
+def rebuild_overdue(cutoff):
+    """Reset the overdue counters to the open tasks due at or before ``cutoff``; nothing is committed."""
+    db.session.execute(update(DashboardCounter).values(overdue=0))
+    record_overdue(dict(_overdue_counts(cutoff)))
+
+
+def get_counters(scope=GLOBAL):
+    counter = db.session.get(DashboardCounter, scope)
+    if counter is None:
+        counter = DashboardCounter(worker_id=scope, assigned=0, in_progress=0, completed=0, active_clients=0, overdue=0)
+    return counter
+
+
+def rebuild_counters():
+    """Recompute every counter row from the task and client tables.
+
+    Returns the number of rows written.
+    """
+    status_sums = [
+        func.coalesce(func.sum(case((Task.status == status, 1), else_=0)), 0).label(column)
+        for status, column in TASK_STATUS_COLUMNS.items()
+    ]
+    per_worker = db.session.execute(select(Task.worker_id, *status_sums).group_by(Task.worker_id)).all()
+    totals = db.session.execute(select(*status_sums)).one()
+    active_clients = db.session.scalar(select(func.count()).select_from(Client).where(Client.status == 'Active'))
+
+    # Overdue only counts what the deadline job has already passed; see app/deadlines.py.
+    watermark = db.session.get(JobWatermark, 'task_deadlines')
+    overdue = dict(_overdue_counts(watermark.value)) if watermark else {}
+
+    rows = [dict(totals._asdict(), worker_id=GLOBAL, active_clients=active_clients, overdue=sum(overdue.values()))]
+    rows += [dict(row._asdict(), active_clients=0, overdue=overdue.pop(row.worker_id, 0)) for row in per_worker]
+
+    db.session.execute(DashboardCounter.__table__.delete())
+    db.session.execute(insert(DashboardCounter), rows)
+    db.session.commit()
+    return len(rows)
@@ -0,0 +1,64 @@
+"""Per-connection database settings.
+
+SQLite is tuned on connect for a server handling several requests at once:
+``journal_mode=WAL`` so that reads don't block on a writer,
+``synchronous=NORMAL`` (safe under WAL, and far fewer fsyncs) and a
+``busy_timeout`` so that concurrent writers queue up rather than failing
+with "database is locked". Other databases only use the pool settings from
+``SQLALCHEMY_ENGINE_OPTIONS``.
+
+``increment`` is the upsert shared by the materialized counters and report
+rollups.
+"""
+from sqlalchemy import event, insert, update
+from sqlalchemy.dialects import postgresql, sqlite
+from app import db
+
+_UPSERT_INSERTS = {'postgresql': postgresql.insert, 'sqlite': sqlite.insert}
+
+
+def _sqlite_pragmas(config):
+    pragmas = (
+        ('journal_mode', config.get('SQLITE_JOURNAL_MODE', 'WAL')),
+        ('synchronous', config.get('SQLITE_SYNCHRONOUS', 'NORMAL')),
+        ('busy_timeout', int(config.get('SQLITE_BUSY_TIMEOUT_MS', 5000))),
+    )
+
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas:
+            if value:
+                cursor.execute(f'PRAGMA {name} = {value}')
+        cursor.close()
+
+    return set_pragmas
+
+
+def increment(model, key, deltas):
+    """Add ``deltas`` to the columns of the ``model`` row whose primary key is ``key``, creating it if missing.
+
+    PostgreSQL and SQLite do it in one ``INSERT ... ON CONFLICT DO UPDATE``,
+    which concurrent writers can't race. Other databases fall back to an
+    UPDATE followed by an INSERT when no row matched.
+    """
+    deltas = {column: delta for column, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    dialect_insert = _UPSERT_INSERTS.get(db.session.get_bind(mapper=model).dialect.name)
+    if dialect_insert is not None:
+        statement = dialect_insert(model).values(**key, **deltas)
+        columns = model.__table__.c
+        db.session.execute(statement.on_conflict_do_update(
+            index_elements=list(key), set_={column: columns[column] + statement.excluded[column] for column in deltas}))
+        return
+    criteria = [getattr(model, column) == value for column, value in key.items()]
+    values = {column: getattr(model, column) + delta for column, delta in deltas.items()}
+    if db.session.execute(update(model).where(*criteria).values(values)).rowcount == 0:
+        db.session.execute(insert(model).values(**key, **deltas))
+
+
+def init_app(app):
+    with app.app_context():
+        engine = db.engine
+    if engine.dialect.name == 'sqlite':
+        event.listen(engine, 'connect', _sqlite_pragmas(app.config))
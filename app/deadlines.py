@@ -0,0 +1,109 @@
+"""Overdue and due-soon alerts for open tasks.
+
+``check_deadlines`` runs every ``DEADLINE_CHECK_INTERVAL`` seconds on the
+scheduler (app/scheduler.py), or once with ``flask check-deadlines``. It
+remembers how far it got in a ``JobWatermark`` row, and each run only
+looks at the deadlines passed since the previous one:
+
+* open tasks whose deadline fell in ``(watermark, now]`` are now overdue;
+* open tasks whose deadline falls in ``(watermark + soon, now + soon]`` are
+  due within ``DEADLINE_DUE_SOON_HOURS``.
+
+Both are range scans on the ``(status, deadline)`` index, read in batches
+of ``DEADLINE_BATCH_SIZE``. Each batch notifies the tasks' workers and
+managers with one ``notify_many``. A run therefore costs the number of
+newly affected tasks, however many tasks there are.
+
+The ``overdue`` dashboard counters count the open tasks whose deadline is
+at or before the watermark. The job adds the tasks it finds overdue, and
+``record_status`` (called by ``tasks.create_task`` and ``change_status``)
+keeps them right when such a task is completed, reopened or created
+already late. A task that opens behind the job's windows would never be
+seen by it, so ``record_status`` also sends that task's overdue or
+due-soon alert itself, in the same transaction. The very first run counts
+the existing backlog once instead of alerting about it.
+"""
+from collections import Counter
+from datetime import datetime, time, timedelta, timezone
+from flask import current_app
+from sqlalchemy import select, tuple_
+from app import counters, db, scheduler
+from app.models import JobWatermark, Task
+from app.notifications import notify_many
+
+WATERMARK = 'task_deadlines'
+OPEN_STATUSES = ('Assigned', 'In Progress')
+
+
+def init_app(app):
+    scheduler.add_job(app, 'task-deadlines', check_deadlines, app.config.get('DEADLINE_CHECK_INTERVAL', 0))
+
+
+def watermark():
+    row = db.session.get(JobWatermark, WATERMARK)
+    return row.value if row else None
+
+
+def check_deadlines(now=None):
+    """Alert about deadlines passed since the last run; returns ``{'overdue': n, 'due_soon': n}``."""
+    now = _naive(now or datetime.utcnow())
+    soon = timedelta(hours=current_app.config['DEADLINE_DUE_SOON_HOURS'])
+    last = watermark()
+    if last is not None and now <= last:
+        return {'overdue': 0, 'due_soon': 0}
+    if last is None:
+        counters.rebuild_overdue(now)
+        overdue = 0
+        due_soon = _alert(now, now + soon, 'task_due_soon', 'is due on')
+    else:
+        overdue = _alert(last, now, 'task_overdue', 'is overdue since', count_overdue=True)
+        due_soon = _alert(last + soon, now + soon, 'task_due_soon', 'is due on')
+    db.session.merge(JobWatermark(name=WATERMARK, value=now))
+    db.session.commit()
+    return {'overdue': overdue, 'due_soon': due_soon}
+
+
+def _alert(start, end, type, phrase, count_overdue=False):
+    batch_size = current_app.config['DEADLINE_BATCH_SIZE']
+    window = select(Task.id, Task.worker_id, Task.manager_id, Task.task_description, Task.deadline).where(
+        Task.status.in_(OPEN_STATUSES), Task.deadline > start, Task.deadline <= end)
+    alerted, after = 0, None
+    while True:
+        statement = window if after is None else window.where(tuple_(Task.deadline, Task.id) > tuple_(*after))
+        rows = db.session.execute(statement.order_by(Task.deadline, Task.id).limit(batch_size)).all()
+        notify_many([_notice(row, type, phrase) for row in rows])
+        if count_overdue:
+            counters.record_overdue(Counter(row.worker_id for row in rows))
+        alerted += len(rows)
+        if len(rows) < batch_size:
+            return alerted
+        after = (rows[-1].deadline, rows[-1].id)
+
+
+def _notice(task, type, phrase):
+    return ({task.worker_id, task.manager_id} - {None},
+            f'Task "{task.task_description}" {phrase} {_naive(task.deadline):%Y-%m-%d %H:%M}', type)
+
+
+def record_status(task, old_status, new_status):
+    """Keep the overdue counters right and alert when a task opens or closes behind the job's windows."""
+    opened = new_status in OPEN_STATUSES
+    if (old_status in OPEN_STATUSES) == opened or task.deadline is None:
+        return
+    last = watermark()
+    if last is None:
+        return
+    deadline = _naive(task.deadline)
+    if deadline <= last:
+        counters.record_overdue({task.worker_id: 1 if opened else -1})
+        if opened:
+            notify_many([_notice(task, 'task_overdue', 'is overdue since')])
+    elif opened and deadline <= last + timedelta(hours=current_app.config['DEADLINE_DUE_SOON_HOURS']):
+        notify_many([_notice(task, 'task_due_soon', 'is due on')])
+
+
+def _naive(moment):
+    # Deadlines come from a date field or back from the database as naive UTC.
+    if not isinstance(moment, datetime):
+        return datetime.combine(moment, time())
+    return moment.astimezone(timezone.utc).replace(tzinfo=None) if moment.tzinfo else moment
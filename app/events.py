@@ -0,0 +1,177 @@
+"""In-process publish/subscribe for the ``/stream`` Server-Sent Events channel.
+
+Each open ``/stream`` connection subscribes with its user's id and role.
+Messages are addressed to a set of user ids and/or to every manager, and
+are only published once the transaction that produced them has committed,
+so a rolled back write never reaches a browser.
+
+``Broker`` lives in one process, which is all a single gunicorn worker
+needs. With several worker processes set ``STREAM_BROKER_BACKEND`` to a
+``redis://`` URL: ``RedisBroker`` publishes through a Redis channel and
+every process delivers each message to its own subscribers.
+
+Every open stream holds a server thread, so a process accepts at most
+``STREAM_MAX_CONNECTIONS`` of them and ``subscribe`` returns ``None`` past
+that; those pages keep polling the unread count instead.
+"""
+import json
+import logging
+import queue
+import threading
+import time
+from flask import current_app
+from sqlalchemy import event
+from app import db
+
+logger = logging.getLogger(__name__)
+
+_PENDING_KEY = 'pending_stream_events'
+
+
+def format_sse(event_name, data):
+    return f'event: {event_name}\ndata: {json.dumps(data)}\n\n'
+
+
+class Subscription:
+    def __init__(self, user_id, is_manager, max_queue):
+        self.user_id = user_id
+        self.is_manager = is_manager
+        self.messages = queue.Queue(maxsize=max_queue)
+
+    def deliver(self, message):
+        try:
+            self.messages.put_nowait(message)
+        except queue.Full:
+            # A client this far behind can't be patched up with deltas; tell it to reload.
+            with self.messages.mutex:
+                self.messages.queue.clear()
+            self.messages.put_nowait(format_sse('resync', {}))
+
+    def get(self, timeout):
+        try:
+            return self.messages.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class Broker:
+    def __init__(self, max_queue=100, max_subscriptions=None):
+        self.max_queue = max_queue
+        self.max_subscriptions = max_subscriptions
+        self._subscriptions = set()
+        self._lock = threading.Lock()
+
+    def subscribe(self, user_id, is_manager):
+        """A new ``Subscription``, or ``None`` when this process already holds ``max_subscriptions``."""
+        subscription = Subscription(user_id, is_manager, self.max_queue)
+        with self._lock:
+            if self.max_subscriptions is not None and len(self._subscriptions) >= self.max_subscriptions:
+                return None
+            self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    def publish(self, event_name, data, user_ids=(), managers=False):
+        user_ids = set(user_ids)
+        message = format_sse(event_name, data)
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+        for subscription in subscriptions:
+            if subscription.user_id in user_ids or (managers and subscription.is_manager):
+                subscription.deliver(message)
+
+    def resync(self):
+        """Tell every subscriber to reload, e.g. after messages may have been lost."""
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+        for subscription in subscriptions:
+            subscription.deliver(format_sse('resync', {}))
+
+
+class RedisBroker(Broker):
+    """Relays messages through a Redis channel to the subscribers of every process; needs the optional ``redis`` package."""
+
+    def __init__(self, url, channel='stream', max_queue=100, max_subscriptions=None):
+        super().__init__(max_queue, max_subscriptions)
+        import redis
+        self._redis = redis.Redis.from_url(url)
+        self._errors = redis.RedisError
+        self.channel = channel
+        self._listener = None
+
+    def subscribe(self, user_id, is_manager):
+        # The listener starts with the first stream rather than at import, so that
+        # processes which never serve one (CLI commands, a preloading master) don't hold it.
+        with self._lock:
+            if self._listener is None:
+                self._listener = threading.Thread(target=self._listen, name='stream-broker', daemon=True)
+                self._listener.start()
+        return super().subscribe(user_id, is_manager)
+
+    def publish(self, event_name, data, user_ids=(), managers=False):
+        message = {'event': event_name, 'data': data, 'user_ids': list(user_ids), 'managers': managers}
+        try:
+            self._redis.publish(self.channel, json.dumps(message))
+        except self._errors:
+            # The clients of this process still get it; the others catch up from polling.
+            logger.exception('could not publish %s on the stream channel', event_name)
+            super().publish(event_name, data, user_ids=user_ids, managers=managers)
+
+    def _listen(self):
+        while True:
+            try:
+                pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self.channel)
+                for raw in pubsub.listen():
+                    message = json.loads(raw['data'])
+                    super().publish(message['event'], message['data'],
+                                    user_ids=message['user_ids'], managers=message['managers'])
+            except self._errors:
+                logger.exception('lost the stream channel; reconnecting')
+                # Anything published while disconnected is gone.
+                self.resync()
+                time.sleep(1)
+
+
+def make_broker(backend=None, channel='stream', max_queue=100, max_subscriptions=None):
+    """``Broker`` for ``None``, ``RedisBroker`` for a ``redis://`` URL."""
+    if not backend:
+        return Broker(max_queue=max_queue, max_subscriptions=max_subscriptions)
+    if backend.startswith(('redis://', 'rediss://', 'unix://')):
+        return RedisBroker(backend, channel=channel, max_queue=max_queue, max_subscriptions=max_subscriptions)
+    raise ValueError(f'unknown stream broker backend {backend!r}')
+
+
+def init_app(app):
+    app.extensions['event_broker'] = make_broker(
+        app.config.get('STREAM_BROKER_BACKEND'),
+        channel=app.config.get('STREAM_BROKER_CHANNEL', 'stream'),
+        max_queue=app.config.get('STREAM_MAX_QUEUE', 100),
+        max_subscriptions=app.config.get('STREAM_MAX_CONNECTIONS'),
+    )
+
+
+def broker():
+    return current_app.extensions['event_broker']
+
+
+def publish_after_commit(event_name, data, user_ids=(), managers=False, session=None):
+    session = session or db.session()
+    session.info.setdefault(_PENDING_KEY, []).append((event_name, data, tuple(user_ids), managers))
+
+
+@event.listens_for(db.session, 'after_commit')
+def _publish_pending(session):
+    pending = session.info.pop(_PENDING_KEY, None)
+    if not pending:
+        return
+    for event_name, data, user_ids, managers in pending:
+        broker().publish(event_name, data, user_ids=user_ids, managers=managers)
+
+
+@event.listens_for(db.session, 'after_soft_rollback')
+def _discard_pending(session, previous_transaction):
+    session.info.pop(_PENDING_KEY, None)
@@ -0,0 +1,117 @@
+"""Streaming CSV exports.
+
+Each download is declared as an ``Export``: a file name plus the
+``(header, column)`` pairs that make up a row. Rows are read with a
+server-side cursor in ``yield_per`` batches and written out in chunks as
+they arrive, so memory stays flat however large the table is and the
+first bytes leave before the last row is read. Clients that accept gzip
+get the stream compressed on the fly when ``EXPORT_GZIP`` is set.
+"""
+import csv
+import io
+import zlib
+from flask import Response, current_app, request
+from sqlalchemy import select
+from app import db
+from app.models import Client, ContentIdea, Metric, OnboardingTask, Task
+
+
+class Export:
+    def __init__(self, filename, columns):
+        self.filename = filename
+        self.headers = [header for header, _ in columns]
+        self.columns = [column for _, column in columns]
+
+    def statement(self, *criteria):
+        return select(*self.columns).where(*criteria).order_by(self.columns[0])
+
+
+CLIENTS = Export('clients.csv', [
+    ('ID', Client.id),
+    ('Name', Client.name),
+    ('Contact Number', Client.contact_number),
+    ('Business Category', Client.business_category),
+    ('Social Media Handles', Client.social_media_handles),
+    ('Goals', Client.goals),
+    ('Specific Requests', Client.specific_requests),
+])
+
+TASKS = Export('tasks.csv', [
+    ('ID', Task.id),
+    ('Manager ID', Task.manager_id),
+    ('Worker ID', Task.worker_id),
+    ('Client ID', Task.client_id),
+    ('Task Description', Task.task_description),
+    ('Deadline', Task.deadline),
+    ('Status', Task.status),
+    ('Completion Description', Task.completion_description),
+    ('Completion Link', Task.completion_link),
+])
+
+ONBOARDING_TASKS = Export('onboarding_tasks.csv', [
+    ('ID', OnboardingTask.id),
+    ('Task Name', OnboardingTask.task_name),
+    ('Responsible', OnboardingTask.responsible),
+    ('Deadline', OnboardingTask.deadline),
+])
+
+CONTENT_IDEAS = Export('content_ideas.csv', [
+    ('ID', ContentIdea.id),
+    ('Idea Source', ContentIdea.idea_source),
+    ('Description', ContentIdea.description),
+    ('Link', ContentIdea.link),
+    ('Sound', ContentIdea.sound),
+    ('Status', ContentIdea.status),
+])
+
+METRICS = Export('metrics.csv', [
+    ('ID', Metric.id),
+    ('Platform', Metric.platform),
+    ('Post Date', Metric.post_date),
+    ('Views', Metric.views),
+    ('Likes', Metric.likes),
+    ('Comments', Metric.comments),
+    ('Shares', Metric.shares),
+])
+
+
+def stream_rows(engine, statement, batch_size):
+    # A connection of its own: the response body is produced after the request's
+    # session has been torn down.
+    with engine.connect() as connection:
+        result = connection.execution_options(stream_results=True, yield_per=batch_size).execute(statement)
+        for partition in result.partitions():
+            yield from partition
+
+
+def csv_chunks(headers, rows, chunk_size):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(headers)
+    for row in rows:
+        writer.writerow(row)
+        if buffer.tell() >= chunk_size:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode('utf-8')
+
+
+def gzip_chunks(chunks):
+    compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def export_response(export, *criteria):
+    config = current_app.config
+    rows = stream_rows(db.engine, export.statement(*criteria), config['EXPORT_BATCH_SIZE'])
+    body = csv_chunks(export.headers, rows, config['EXPORT_CHUNK_SIZE'])
+    headers = {'Content-Disposition': f'attachment; filename={export.filename}', 'Vary': 'Accept-Encoding'}
+    if config['EXPORT_GZIP'] and 'gzip' in request.accept_encodings:
+        body = gzip_chunks(body)
+        headers['Content-Encoding'] = 'gzip'
+    return Response(body, mimetype='text/csv', headers=headers)
@@ -1,18 +1,17 @@
 
 from flask_wtf import FlaskForm
-from wtforms import StringField, SubmitField, IntegerField, TextAreaField, PasswordField, SelectField
-from wtforms.validators import DataRequired, Email, Length
-from wtforms_sqlalchemy.fields import QuerySelectField
-from app.models import Client
+from flask_wtf.file import FileField, FileRequired, FileAllowed
+from wtforms import StringField, SubmitField, IntegerField, TextAreaField, PasswordField
+from wtforms.validators import DataRequired, Email, Length, ValidationError
 from wtforms.fields import HiddenField
 from wtforms.fields import DateField
 from wtforms.validators import Optional
-from app.models import User
+from app import choices, metrics_io
 
 
 
 def client_choices():
-    return Client.query.all()
+    return list(choices.options('clients').items())
 
 class ClientForm(FlaskForm):
     name = StringField('Name', validators=[DataRequired()])
@@ -46,21 +45,34 @@ class MetricForm(FlaskForm):
     shares = IntegerField('Shares', validators=[DataRequired()])
     submit = SubmitField('Add Metric')
 
+    def validate_post_date(self, field):
+        if metrics_io.parse_post_date(field.data) is None:
+            raise ValidationError('Not a recognised date.')
+
+
+class MetricImportForm(FlaskForm):
+    file = FileField('Metrics File (.csv or .parquet)', validators=[FileRequired(), FileAllowed(['csv', 'parquet'])])
+    submit = SubmitField('Import Metrics')
 
 
 class TaskForm(FlaskForm):
-    worker_email = SelectField('Worker Email', validators=[DataRequired()])
-    client_id = SelectField('Client', validators=[DataRequired()], coerce=int)
+    # Ids picked with the typeahead (choices_feed) and checked against the cached choice lists.
+    worker_id = IntegerField('Worker', validators=[DataRequired()])
+    client_id = IntegerField('Client', validators=[DataRequired()])
     task_description = TextAreaField('Task Description', validators=[DataRequired()])
     deadline = DateField('Deadline', validators=[DataRequired()])
     submit = SubmitField('Assign Task')
 
+    def validate_worker_id(self, field):
+        if choices.label('workers', field.data) is None:
+            raise ValidationError('Unknown worker.')
 
-    def __init__(self, *args, **kwargs):
-        super(TaskForm, self).__init__(*args, **kwargs)
-        self.worker_email.choices = [(worker.email, worker.name) for worker in User.query.filter_by(is_manager=False).all()]
+    def validate_client_id(self, field):
+        if choices.label('clients', field.data) is None:
+            raise ValidationError('Unknown client.')
 
 class TaskSubmissionForm(FlaskForm):
+    task_id = HiddenField('Task ID', validators=[Optional()])
     completion_description = TextAreaField('Completion Description', validators=[DataRequired()])
     completion_link = StringField('Completion Link', validators=[DataRequired()])
     submit = SubmitField('Submit Task')
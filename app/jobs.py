@@ -0,0 +1,145 @@
+"""In-process background job queue.
+
+``BatchQueue`` hands queued items to a handler in batches on a small pool
+of daemon threads. An item only leaves the queue once the handler has
+returned for its batch, so a failing batch is put back and retried and
+delivery is at-least-once while the process lives (items are only held in
+memory). Retries wait longer after each consecutive failure, and a batch
+that failed is retried in halves, so one item that always fails ends up on
+its own instead of holding back everything queued behind it. Once it has
+failed ``max_attempts`` times it is handed to ``dead_letter`` (by default
+logged) and dropped. ``shutdown`` (registered with ``atexit`` by default)
+stops accepting work and drains what is left before the process exits.
+"""
+import atexit
+import logging
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+
+def log_metrics(metrics):
+    logger.debug('%(queue)s drained %(batch_size)d items in %(drain_seconds).3fs '
+                 '(waited %(wait_seconds).3fs, %(depth)d still queued)', metrics)
+
+
+def log_dead_letter(name, item):
+    logger.error('%s gave up on %r', name, item)
+
+
+class BatchQueue:
+    def __init__(self, handler, name='jobs', batch_size=100, workers=1, retry_delay=1.0, max_retry_delay=30.0,
+                 max_attempts=10, dead_letter=log_dead_letter, metrics_hook=log_metrics, flush_on_exit=True):
+        self.handler = handler
+        self.name = name
+        self.batch_size = batch_size
+        self.workers = workers
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.max_attempts = max_attempts
+        self.dead_letter = dead_letter
+        self.metrics_hook = metrics_hook
+        self.dead_lettered = 0
+        self._items = deque()
+        self._in_flight = 0
+        self._failures = 0
+        self._cond = threading.Condition()
+        self._threads = []
+        self._stopping = False
+        if flush_on_exit:
+            atexit.register(self.shutdown, timeout=10)
+
+    def put(self, item):
+        with self._cond:
+            if self._stopping:
+                raise RuntimeError(f'{self.name} queue is shut down')
+            self._items.append((item, time.monotonic(), 0))
+            if not self._threads:
+                self._start()
+            self._cond.notify()
+
+    def depth(self):
+        with self._cond:
+            return len(self._items) + self._in_flight
+
+    def flush(self, timeout=None):
+        """Block until every queued item has been handled; returns False on timeout."""
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._items and not self._in_flight, timeout)
+
+    def shutdown(self, timeout=None):
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        drained = self.flush(timeout)
+        if drained:
+            for thread in self._threads:
+                thread.join(timeout)
+        return drained
+
+    def _start(self):
+        # Caller holds the lock.
+        for number in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f'{self.name}-{number}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _take_batch(self):
+        with self._cond:
+            while not self._items:
+                if self._stopping:
+                    return None
+                self._cond.wait()
+            # Items that failed before come back in smaller batches: half as many per failed attempt.
+            size = max(1, self.batch_size >> self._items[0][2])
+            batch = [self._items.popleft() for _ in range(min(size, len(self._items)))]
+            self._in_flight += len(batch)
+            return batch
+
+    def _run(self):
+        while True:
+            batch = self._take_batch()
+            if batch is None:
+                return
+            started = time.monotonic()
+            try:
+                self.handler([item for item, _, _ in batch])
+            except Exception:
+                self._failed(batch)
+                continue
+            finished = time.monotonic()
+            with self._cond:
+                self._failures = 0
+                self._in_flight -= len(batch)
+                depth = len(self._items) + self._in_flight
+                self._cond.notify_all()
+            if self.metrics_hook:
+                self.metrics_hook({
+                    'queue': self.name,
+                    'depth': depth,
+                    'batch_size': len(batch),
+                    'drain_seconds': finished - started,
+                    'wait_seconds': started - batch[0][1],
+                })
+
+    def _failed(self, batch):
+        batch = [(item, enqueued, attempts + 1) for item, enqueued, attempts in batch]
+        dead = batch if len(batch) == 1 and batch[0][2] >= self.max_attempts else []
+        if dead:
+            logger.exception('%s item failed %d times; giving up', self.name, batch[0][2])
+        else:
+            logger.exception('%s batch of %d failed; retrying', self.name, len(batch))
+        with self._cond:
+            if not dead:
+                self._items.extendleft(reversed(batch))
+            self._in_flight -= len(batch)
+            self._failures += 1
+            failures = self._failures
+            self._cond.notify_all()
+        for item, _, _ in dead:
+            self.dead_lettered += 1
+            if self.dead_letter:
+                self.dead_letter(self.name, item)
+        time.sleep(min(self.retry_delay * 2 ** (failures - 1), self.max_retry_delay))
@@ -0,0 +1,214 @@
+"""Bulk export and import of the ``Metric`` table.
+
+Exports cover all clients or a selection of them, as CSV or as a Parquet
+file with one row group per batch. Imports read a CSV or Parquet file,
+validate every row and insert the valid ones with batched executemany
+INSERTs in a single transaction.
+
+Parquet support needs the optional ``pyarrow`` package.
+"""
+import csv
+import io
+from datetime import datetime
+from itertools import islice
+from sqlalchemy import insert, select
+from app import db
+from app.exports import Export, csv_chunks, stream_rows
+from app.models import Client, Metric
+
+METRICS_ALL = Export('metrics.csv', [
+    ('ID', Metric.id),
+    ('Client ID', Metric.client_id),
+    ('Platform', Metric.platform),
+    ('Post Date', Metric.post_date),
+    ('Views', Metric.views),
+    ('Likes', Metric.likes),
+    ('Comments', Metric.comments),
+    ('Shares', Metric.shares),
+])
+
+# Formats seen in the free-text post_date column, tried in order (day-first before month-first).
+POST_DATE_FORMATS = ('%Y-%m-%d', '%d/%m/%Y', '%m/%d/%Y', '%d-%m-%Y', '%Y/%m/%d', '%d.%m.%Y',
+                     '%d %b %Y', '%d %B %Y', '%b %d, %Y', '%B %d, %Y', '%d/%m/%y')
+
+COUNT_FIELDS = ('views', 'likes', 'comments', 'shares')
+REQUIRED_FIELDS = ('client_id', 'platform', 'post_date') + COUNT_FIELDS
+MAX_REPORTED_ERRORS = 100
+
+
+class MetricFileError(ValueError):
+    pass
+
+
+def parse_post_date(value):
+    """Best-effort parse of a free-text post date; ``None`` if no known format matches."""
+    value = (value or '').strip()
+    for candidate in (value, value[:10]):
+        for date_format in POST_DATE_FORMATS:
+            try:
+                return datetime.strptime(candidate, date_format).date()
+            except ValueError:
+                continue
+    return None
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise MetricFileError('Parquet support needs the optional pyarrow package.') from None
+    return pyarrow
+
+
+def _batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def export_statement(client_ids=None):
+    criteria = [Metric.client_id.in_(client_ids)] if client_ids else []
+    return METRICS_ALL.statement(*criteria)
+
+
+def export_csv(engine, client_ids=None, batch_size=1000, chunk_size=64 * 1024):
+    rows = stream_rows(engine, export_statement(client_ids), batch_size)
+    return csv_chunks(METRICS_ALL.headers, rows, chunk_size)
+
+
+class _ChunkSink(io.RawIOBase):
+    # Collects what the Parquet writer emits so it can be streamed out between row groups.
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def take(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def export_parquet(engine, client_ids=None, batch_size=50000):
+    pa = _pyarrow()
+    names = [column.key for column in METRICS_ALL.columns]
+    schema = pa.schema([(name, pa.string() if name in ('platform', 'post_date') else pa.int64()) for name in names])
+
+    def generate():
+        sink = _ChunkSink()
+        writer = pa.parquet.ParquetWriter(sink, schema)
+        for batch in _batched(stream_rows(engine, export_statement(client_ids), batch_size), batch_size):
+            arrays = [pa.array(values, type=field.type) for values, field in zip(zip(*batch), schema)]
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+            yield sink.take()
+        writer.close()
+        yield sink.take()
+
+    return generate()
+
+
+def _normalise(name):
+    return name.strip().lower().replace(' ', '_')
+
+
+# Both readers are lazy, so a file that turns out to be unreadable part way through
+# raises MetricFileError from the import loop rather than from read_metrics.
+def read_csv(stream):
+    reader = csv.DictReader(io.TextIOWrapper(stream, encoding='utf-8-sig', newline=''))
+    try:
+        for row in reader:
+            yield {_normalise(key): value for key, value in row.items() if key}
+    except UnicodeDecodeError:
+        raise MetricFileError('The CSV file is not UTF-8 encoded.') from None
+    except csv.Error as error:
+        raise MetricFileError(f'The CSV file could not be read: {error}') from None
+
+
+def read_parquet(stream, batch_size=50000):
+    pa = _pyarrow()
+    try:
+        for batch in pa.parquet.ParquetFile(stream).iter_batches(batch_size=batch_size):
+            for row in batch.to_pylist():
+                yield {_normalise(key): value for key, value in row.items()}
+    except (pa.lib.ArrowException, OSError) as error:
+        raise MetricFileError(f'The Parquet file could not be read: {error}') from None
+
+
+def read_metrics(stream, filename):
+    if filename.lower().endswith('.parquet'):
+        return read_parquet(stream)
+    if filename.lower().endswith('.csv'):
+        return read_csv(stream)
+    raise MetricFileError('Metrics can be imported from .csv or .parquet files.')
+
+
+def _validate(row):
+    missing = [field for field in REQUIRED_FIELDS if row.get(field) in (None, '')]
+    if missing:
+        raise ValueError(f'missing {", ".join(missing)}')
+    values = {'platform': str(row['platform']).strip(), 'post_date': str(row['post_date']).strip()}
+    values['posted_on'] = parse_post_date(values['post_date'])
+    # Without a parsed date the row would drop out of every analytics date range.
+    if values['posted_on'] is None:
+        raise ValueError('post_date is not a recognised date')
+    for field in ('client_id',) + COUNT_FIELDS:
+        try:
+            values[field] = int(row[field])
+            # Parquet hands over floats, which int() would silently truncate.
+            if isinstance(row[field], float) and row[field] != values[field]:
+                raise ValueError
+        except (TypeError, ValueError, OverflowError):
+            raise ValueError(f'{field} must be a whole number') from None
+        if values[field] < 0:
+            raise ValueError(f'{field} must not be negative')
+    return values
+
+
+def import_metrics(rows, batch_size=5000):
+    """Validate and insert metric rows; nothing is committed.
+
+    Returns ``(imported, skipped, errors)`` where ``errors`` lists ``(row
+    number, message)`` for the first ``MAX_REPORTED_ERRORS`` skipped rows.
+    """
+    imported = 0
+    skipped = 0
+    errors = []
+    known_clients = set()
+
+    def skip(number, message):
+        nonlocal skipped
+        skipped += 1
+        if len(errors) < MAX_REPORTED_ERRORS:
+            errors.append((number, message))
+
+    for offset, batch in enumerate(_batched(rows, batch_size)):
+        valid = []
+        for number, row in enumerate(batch, start=offset * batch_size + 1):
+            try:
+                valid.append((number, _validate(row)))
+            except ValueError as error:
+                skip(number, str(error))
+        unknown = {values['client_id'] for _, values in valid} - known_clients
+        if unknown:
+            known_clients.update(db.session.scalars(select(Client.id).where(Client.id.in_(unknown))))
+        rows_to_insert = []
+        for number, values in valid:
+            if values['client_id'] in known_clients:
+                rows_to_insert.append(values)
+            else:
+                skip(number, f'client {values["client_id"]} does not exist')
+        if rows_to_insert:
+            db.session.execute(insert(Metric), rows_to_insert)
+            imported += len(rows_to_insert)
+    return imported, skipped, sorted(errors)
@@ -1,7 +1,7 @@
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
 from app import db
-from datetime import datetime
+from datetime import datetime, timezone
 
 class User(UserMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -13,29 +13,34 @@ class User(UserMixin, db.Model):
     tasks_working_on = db.relationship('Task', backref='assigned_worker', lazy=True, foreign_keys='Task.worker_id')
 
 class Client(db.Model):
+    __table_args__ = (
+        db.Index('ix_client_created_at_id', 'created_at', 'id'),
+        db.Index('ix_client_user_id_created_at_id', 'user_id', 'created_at', 'id'),
+    )
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
     name = db.Column(db.String(150))
     contact_number = db.Column(db.String(50))
     business_category = db.Column(db.String(100))
     social_media_handles = db.Column(db.String(150))
     goals = db.Column(db.String(250))
     specific_requests = db.Column(db.String(250))
-    status = db.Column(db.String(50))  # Add this line to ensure status column is present
+    status = db.Column(db.String(50), index=True)  # Add this line to ensure status column is present
+    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
     onboarding_tasks = db.relationship('OnboardingTask', backref='client', lazy=True)
     content_ideas = db.relationship('ContentIdea', backref='client', lazy=True)
     metrics = db.relationship('Metric', backref='client', lazy=True)
 
 class OnboardingTask(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    client_id = db.Column(db.Integer, db.ForeignKey('client.id'), nullable=False)
+    client_id = db.Column(db.Integer, db.ForeignKey('client.id'), nullable=False, index=True)
     task_name = db.Column(db.String(150))
     responsible = db.Column(db.String(50))
     deadline = db.Column(db.String(50))
 
 class ContentIdea(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    client_id = db.Column(db.Integer, db.ForeignKey('client.id'), nullable=False)
+    client_id = db.Column(db.Integer, db.ForeignKey('client.id'), nullable=False, index=True)
     idea_source = db.Column(db.String(100))
     description = db.Column(db.String(250))
     link = db.Column(db.String(250))
@@ -43,10 +48,14 @@ class ContentIdea(db.Model):
     status = db.Column(db.String(50))
 
 class Metric(db.Model):
+    __table_args__ = (
+        db.Index('ix_metric_client_id_posted_on', 'client_id', 'posted_on'),
+    )
     id = db.Column(db.Integer, primary_key=True)
-    client_id = db.Column(db.Integer, db.ForeignKey('client.id'), nullable=False)
+    client_id = db.Column(db.Integer, db.ForeignKey('client.id'), nullable=False, index=True)
     platform = db.Column(db.String(100))
     post_date = db.Column(db.String(50))
+    posted_on = db.Column(db.Date)  # post_date parsed, so date ranges can be filtered in SQL
     views = db.Column(db.Integer)
     likes = db.Column(db.Integer)
     comments = db.Column(db.Integer)
@@ -56,26 +65,126 @@ from datetime import datetime, timezone
 from app import db
 
 class Task(db.Model):
+    __table_args__ = (
+        db.Index('ix_task_worker_id_status', 'worker_id', 'status'),
+        # Keyset pagination of the task lists, see app/pagination.py.
+        db.Index('ix_task_created_at_id', 'created_at', 'id'),
+        db.Index('ix_task_deadline_id', 'deadline', 'id'),
+        db.Index('ix_task_status_created_at_id', 'status', 'created_at', 'id'),
+        db.Index('ix_task_worker_id_created_at_id', 'worker_id', 'created_at', 'id'),
+        # Deadline windows of the open statuses, see app/deadlines.py.
+        db.Index('ix_task_status_deadline', 'status', 'deadline'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     manager_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     worker_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    client_id = db.Column(db.Integer, db.ForeignKey('client.id'), nullable=False)
+    client_id = db.Column(db.Integer, db.ForeignKey('client.id'), nullable=False, index=True)
     task_description = db.Column(db.String(255), nullable=False)
     deadline = db.Column(db.DateTime, nullable=False)
-    status = db.Column(db.String(50), nullable=False)
+    status = db.Column(db.String(50), nullable=False, index=True)
     completion_description = db.Column(db.Text)
     completion_link = db.Column(db.String(255))
     created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
     in_progress_time = db.Column(db.DateTime)
     completion_time = db.Column(db.DateTime)
+    # Bumped by every ORM update, which only matches the version it read, so
+    # concurrent edits of one task fail with StaleDataError instead of racing.
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+    __mapper_args__ = {'version_id_col': version}
 
 
 
 
 class Notification(db.Model):
+    __table_args__ = (
+        # Serves both the unread badge count and the newest-first unread list.
+        db.Index('ix_notification_user_id_read_timestamp', 'user_id', 'read', 'timestamp'),
+        # Lets the retention job (app/retention.py) find old read or unread rows without a scan.
+        db.Index('ix_notification_read_timestamp', 'read', 'timestamp'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     message = db.Column(db.String(250))
     type = db.Column(db.String(50))
     timestamp = db.Column(db.DateTime, default=db.func.current_timestamp())
     read = db.Column(db.Boolean, default=False)
+
+
+class DashboardCounter(db.Model):
+    # worker_id 0 holds the agency-wide totals, every other row belongs to one worker.
+    worker_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    assigned = db.Column(db.Integer, nullable=False, default=0)
+    in_progress = db.Column(db.Integer, nullable=False, default=0)
+    completed = db.Column(db.Integer, nullable=False, default=0)
+    active_clients = db.Column(db.Integer, nullable=False, default=0)
+    overdue = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+
+
+class JobWatermark(db.Model):
+    # How far a periodic job has got (e.g. the last deadline check), so each run only sees what is new.
+    name = db.Column(db.String(50), primary_key=True)
+    value = db.Column(db.DateTime, nullable=False)
+
+
+class NotificationArchive(db.Model):
+    # Notifications moved out of the notification table by app/retention.py; kept
+    # compact with no foreign key and no index. The database reuses notification ids
+    # once their rows are gone, so the original id is a plain column, not the key.
+    id = db.Column(db.Integer, primary_key=True)
+    notification_id = db.Column(db.Integer, nullable=False)
+    user_id = db.Column(db.Integer, nullable=False)
+    message = db.Column(db.String(250))
+    type = db.Column(db.String(50))
+    timestamp = db.Column(db.DateTime)
+    read = db.Column(db.Boolean)
+
+
+class NotificationOutbox(db.Model):
+    # Notification events committed with the write that caused them, waiting to be delivered.
+    id = db.Column(db.Integer, primary_key=True)
+    payload = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime, default=db.func.current_timestamp())
+
+
+class TaskRollup(db.Model):
+    # Completed-task totals per (dimension, scope_id, week); dimension is 'worker',
+    # 'client' or 'all' (scope_id 0). Maintained by app/reports.py.
+    __table_args__ = (
+        db.Index('ix_task_rollup_dimension_week', 'dimension', 'week'),
+    )
+    dimension = db.Column(db.String(10), primary_key=True)
+    scope_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    week = db.Column(db.Date, primary_key=True)
+    completed = db.Column(db.Integer, nullable=False, default=0)
+    on_time = db.Column(db.Integer, nullable=False, default=0)
+    cycle_seconds = db.Column(db.Float, nullable=False, default=0)
+    lead_seconds = db.Column(db.Float, nullable=False, default=0)
+
+
+class DurationBucket(db.Model):
+    # One app.sketch.LogHistogram bucket of cycle or lead times for a TaskRollup row.
+    __table_args__ = (
+        db.Index('ix_duration_bucket_dimension_week', 'dimension', 'week'),
+    )
+    dimension = db.Column(db.String(10), primary_key=True)
+    scope_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    week = db.Column(db.Date, primary_key=True)
+    metric = db.Column(db.String(10), primary_key=True)
+    bucket = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+
+class WorkerDuration(db.Model):
+    # All-time completion totals of one worker, next to the per-week TaskRollup
+    # rows so the dashboard reads a single row. Maintained by app/reports.py.
+    worker_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    completed = db.Column(db.Integer, nullable=False, default=0)
+    measured = db.Column(db.Integer, nullable=False, default=0)
+    cycle_seconds = db.Column(db.Float, nullable=False, default=0)
+
+
+class WorkerDurationBucket(db.Model):
+    # One app.sketch.LogHistogram bucket of a worker's all-time cycle times.
+    worker_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    bucket = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    count = db.Column(db.Integer, nullable=False, default=0)
@@ -0,0 +1,237 @@
+"""Notification creation, delivery and the per-user unread counter cache.
+
+``notify`` and ``notify_managers`` turn a message into one event for a set
+of recipients. How the event becomes notification rows depends on
+``NOTIFICATION_DELIVERY``:
+
+* ``'inline'`` writes all rows with one executemany INSERT inside the
+  caller's transaction.
+* ``'queue'`` (the default) hands the event to a background ``BatchQueue``
+  once the caller's transaction commits, so request latency no longer
+  includes the notification writes. Events of a rolled back transaction
+  are dropped.
+* ``'outbox'`` stores the event in the ``notification_outbox`` table in the
+  caller's transaction and lets the background worker move it into the
+  notification table, so nothing is lost if the process dies in between.
+
+``'queue'`` delivers at least once while the process lives, but events it
+still holds in memory are lost if the process dies; ``'outbox'`` survives
+that. Either way an event whose delivery keeps failing is retried in ever
+smaller batches and dropped, with an error logged, after
+``NOTIFICATION_QUEUE_MAX_ATTEMPTS`` attempts (see ``BatchQueue``). The
+manager ids come from the cache in app/users.py, since they are needed for
+almost every write.
+
+The unread badge is rendered on every page, so its count is served from a
+cache instead of the notification table. The cache is write-through: every
+notification insert and every mark-as-read records a delta on the current
+session, and the deltas are applied once that session commits (and dropped
+if it rolls back). Users that are not cached are simply counted again on
+their next page view. Every applied change is also pushed to the user's
+open ``/stream`` connections.
+"""
+import json
+from collections import Counter
+from importlib import import_module
+from flask import current_app
+from sqlalchemy import delete, event, func, insert, select, update
+from sqlalchemy.orm import object_session
+from app import db, events, users
+from app.cache import make_cache
+from app.jobs import BatchQueue, log_metrics
+from app.models import Notification, NotificationOutbox
+
+_DELTAS_KEY = 'unread_deltas'
+_EVENTS_KEY = 'notification_events'
+_OUTBOX_KEY = 'notification_outbox'
+
+
+def init_app(app):
+    app.extensions['unread_counts'] = make_cache(
+        app.config.get('UNREAD_COUNT_CACHE_BACKEND'),
+        prefix='unread:',
+        maxsize=app.config.get('UNREAD_COUNT_CACHE_SIZE', 10000),
+        ttl=app.config.get('UNREAD_COUNT_CACHE_TTL', 300),
+    )
+
+    metrics_hook = app.config.get('NOTIFICATION_QUEUE_METRICS_HOOK') or log_metrics
+    if isinstance(metrics_hook, str):
+        module_name, _, function = metrics_hook.partition(':')
+        metrics_hook = getattr(import_module(module_name), function)
+    outbox = app.config.get('NOTIFICATION_DELIVERY', 'queue') == 'outbox'
+    app.extensions['notification_queue'] = BatchQueue(
+        lambda items: (_drain_outbox if outbox else _deliver)(app, items),
+        name='notifications',
+        batch_size=app.config.get('NOTIFICATION_QUEUE_BATCH_SIZE', 500),
+        # Several threads draining one outbox would only deliver the same rows twice.
+        workers=1 if outbox else app.config.get('NOTIFICATION_QUEUE_WORKERS', 1),
+        max_attempts=app.config.get('NOTIFICATION_QUEUE_MAX_ATTEMPTS', 10),
+        metrics_hook=metrics_hook,
+    )
+
+
+def flush(timeout=None):
+    """Wait for queued notifications to be written; used by tests and CLI commands."""
+    return current_app.extensions['notification_queue'].flush(timeout)
+
+
+def _cache():
+    return current_app.extensions['unread_counts']
+
+
+def unread_count(user_id):
+    cache = _cache()
+    count = cache.get(user_id)
+    if count is None:
+        count = Notification.query.filter_by(user_id=user_id, read=False).count()
+        cache.set(user_id, count)
+    return count
+
+
+def track_unread(user_id, delta, session=None):
+    """Queue a change to ``user_id``'s unread count until the session commits."""
+    session = session or db.session()
+    session.info.setdefault(_DELTAS_KEY, Counter())[user_id] += delta
+
+
+def _insert(events):
+    rows = [
+        {'user_id': user_id, 'message': event['message'], 'type': event['type'], 'read': False}
+        for event in events for user_id in event['user_ids']
+    ]
+    if not rows:
+        return
+    db.session.execute(insert(Notification), rows)
+    for row in rows:
+        track_unread(row['user_id'], 1)
+
+
+def notify(user_ids, message, type):
+    """Send ``message`` to every user in ``user_ids`` as part of the current transaction."""
+    notify_many([(user_ids, message, type)])
+
+
+def notify_many(notifications):
+    """``notify`` for a list of ``(user_ids, message, type)``, written in one batch."""
+    # Messages quote user input (task descriptions), so they are cut to fit the column
+    # rather than failing the write on databases that enforce the length.
+    length = Notification.message.type.length
+    events = [{'user_ids': sorted(user_ids), 'message': message[:length], 'type': type}
+              for user_ids, message, type in notifications]
+    events = [event for event in events if event['user_ids']]
+    if not events:
+        return
+    delivery = current_app.config.get('NOTIFICATION_DELIVERY', 'queue')
+    if delivery == 'inline':
+        _insert(events)
+    elif delivery == 'outbox':
+        db.session.add_all([NotificationOutbox(payload=json.dumps(event)) for event in events])
+        db.session.info[_OUTBOX_KEY] = True
+    else:
+        db.session.info.setdefault(_EVENTS_KEY, []).extend(events)
+
+
+def notify_managers(message, type):
+    notify(users.manager_ids(), message, type)
+
+
+def mark_read(user_id, ids=None, type=None):
+    """Mark ``user_id``'s unread notifications as read with one UPDATE; returns how many changed.
+
+    Without ``ids`` or ``type`` that is all of them, otherwise only those
+    with one of ``ids`` and/or of ``type``.
+    """
+    statement = update(Notification).where(Notification.user_id == user_id, Notification.read == False)
+    if ids is not None:
+        statement = statement.where(Notification.id.in_(ids))
+    if type is not None:
+        statement = statement.where(Notification.type == type)
+    count = db.session.execute(statement.values(read=True), execution_options={'synchronize_session': False}).rowcount
+    if count:
+        track_unread(user_id, -count)
+    return count
+
+
+def unread_types(user_id):
+    """``[(type, unread count)]`` for the inbox's type filter."""
+    return db.session.execute(
+        select(Notification.type, func.count()).where(Notification.user_id == user_id, Notification.read == False)
+        .group_by(Notification.type).order_by(Notification.type)
+    ).all()
+
+
+@event.listens_for(Notification, 'after_insert')
+def _notification_inserted(mapper, connection, target):
+    if not target.read:
+        track_unread(target.user_id, 1, object_session(target))
+
+
+def _deliver(app, events):
+    with app.app_context():
+        try:
+            _insert(events)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+
+def _drain_outbox(app, wakeups):
+    # Each wakeup only says "there is something to do"; drain whatever is in the table.
+    with app.app_context():
+        batch_size = app.config.get('NOTIFICATION_QUEUE_BATCH_SIZE', 500)
+        while True:
+            rows = db.session.execute(
+                select(NotificationOutbox.id, NotificationOutbox.payload).order_by(NotificationOutbox.id).limit(batch_size)
+            ).all()
+            if not rows:
+                return
+            try:
+                _insert([json.loads(row.payload) for row in rows])
+                db.session.execute(delete(NotificationOutbox).where(NotificationOutbox.id.in_([row.id for row in rows])))
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                raise
+
+
+def drain_outbox():
+    """Deliver everything left in the outbox, e.g. events written before a crash."""
+    _drain_outbox(current_app._get_current_object(), [])
+
+
+@event.listens_for(db.session, 'after_commit')
+def _enqueue_notification_events(session):
+    events = session.info.pop(_EVENTS_KEY, None)
+    wake_outbox = session.info.pop(_OUTBOX_KEY, False)
+    if not events and not wake_outbox:
+        return
+    queue = current_app.extensions['notification_queue']
+    for event in events or ():
+        queue.put(event)
+    if wake_outbox:
+        queue.put(None)
+
+
+@event.listens_for(db.session, 'after_commit')
+def _apply_unread_deltas(session):
+    deltas = session.info.pop(_DELTAS_KEY, None)
+    if not deltas:
+        return
+    cache = _cache()
+    for user_id, delta in deltas.items():
+        if not delta:
+            continue
+        count = cache.incr(user_id, delta)
+        if count is not None and count < 0:
+            cache.delete(user_id)
+            count = None
+        # Connected clients get the new count, or just the change if this user isn't cached.
+        events.broker().publish('unread', {'count': count} if count is not None else {'delta': delta}, user_ids=[user_id])
+
+
+@event.listens_for(db.session, 'after_soft_rollback')
+def _discard_pending(session, previous_transaction):
+    session.info.pop(_DELTAS_KEY, None)
+    session.info.pop(_EVENTS_KEY, None)
+    session.info.pop(_OUTBOX_KEY, None)
@@ -0,0 +1,119 @@
+"""Keyset (seek) pagination helpers shared by the board and list views."""
+import base64
+import json
+from datetime import date, datetime, timedelta
+from flask import abort
+from sqlalchemy import tuple_
+
+
+def keyset_page(query, column, cursor=None, limit=50):
+    """Return ``(rows, next_cursor)`` for ``query`` ordered by ``column`` descending.
+
+    ``cursor`` is the ``column`` value of the last row of the previous page.
+    One extra row is fetched to tell whether another page exists, so no
+    ``COUNT(*)`` is ever needed.
+    """
+    if cursor is not None:
+        query = query.filter(column < cursor)
+    rows = query.order_by(column.desc()).limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = getattr(rows[-1], column.key)
+    return rows, next_cursor
+
+
+def seek_page(query, column, tiebreaker, after=None, limit=50, descending=True):
+    """Like ``keyset_page`` but ordered by ``(column, tiebreaker)``, for columns that repeat.
+
+    ``after`` is the ``(column, tiebreaker)`` pair of the last row of the
+    previous page and the next cursor is returned in the same form. Both
+    columns must be NOT NULL, since a NULL never compares in a row value.
+    """
+    key = tuple_(column, tiebreaker)
+    if after is not None:
+        query = query.filter(key < tuple_(*after) if descending else key > tuple_(*after))
+    order = (column.desc(), tiebreaker.desc()) if descending else (column.asc(), tiebreaker.asc())
+    rows = query.order_by(*order).limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = (getattr(rows[-1], column.key), getattr(rows[-1], tiebreaker.key))
+    return rows, next_cursor
+
+
+def equals(column, convert=str):
+    return convert, lambda value: column == value
+
+
+def on_or_after(column):
+    return date.fromisoformat, lambda value: column >= value
+
+
+def on_or_before(column):
+    # Deadlines carry a time, so the bound covers the whole of the given day.
+    return date.fromisoformat, lambda value: column < value + timedelta(days=1)
+
+
+class Listing:
+    """A paginated list: the columns it may be sorted by and the filters it accepts.
+
+    ``sorts`` maps a sort name to a NOT NULL column and ``filters`` maps a
+    query argument to ``(convert, criterion)``, as built by ``equals`` and
+    friends. Anything not in these whitelists is ignored.
+    """
+
+    def __init__(self, model, sorts, filters, default_sort='created_at'):
+        self.model = model
+        self.sorts = sorts
+        self.filters = filters
+        self.default_sort = default_sort
+
+    def page(self, query, args, limit):
+        """Filter, sort and seek ``query`` from the request ``args``; see ``Page``."""
+        applied = {}
+        for name, (convert, criterion) in self.filters.items():
+            value = args.get(name, type=convert)
+            if value not in (None, ''):
+                applied[name] = value
+                query = query.filter(criterion(value))
+        sort = args.get('sort') if args.get('sort') in self.sorts else self.default_sort
+        descending = args.get('order') != 'asc'
+        column = self.sorts[sort]
+        after = self._decode(args.get('cursor'), sort, descending, column)
+        rows, next_key = seek_page(query, column, self.model.id, after, limit, descending)
+        next_cursor = self._encode(sort, descending, next_key) if next_key else None
+        return Page(rows, next_cursor, sort, 'desc' if descending else 'asc', applied)
+
+    @staticmethod
+    def _encode(sort, descending, key):
+        value, row_id = key
+        if isinstance(value, (date, datetime)):
+            value = value.isoformat()
+        payload = json.dumps([sort, descending, value, row_id]).encode()
+        return base64.urlsafe_b64encode(payload).decode().rstrip('=')
+
+    @staticmethod
+    def _decode(cursor, sort, descending, column):
+        if not cursor:
+            return None
+        try:
+            payload = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+            cursor_sort, cursor_descending, value, row_id = json.loads(payload)
+            if column.type.python_type in (date, datetime):
+                value = column.type.python_type.fromisoformat(value)
+        except (ValueError, TypeError):
+            abort(400)
+        # A cursor only makes sense for the ordering it was taken from.
+        if (cursor_sort, cursor_descending) != (sort, descending):
+            abort(400)
+        return value, row_id
+
+
+class Page:
+    def __init__(self, rows, next_cursor, sort, order, filters):
+        self.rows = rows
+        self.next_cursor = next_cursor
+        self.sort = sort
+        self.order = order
+        self.filters = filters
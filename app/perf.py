@@ -0,0 +1,204 @@
+"""Opt-in per-request profiling (``PERF_ENABLED``).
+
+Every request gets a ``RequestProfile`` that the SQLAlchemy cursor events
+and Flask's template signals fill in: how many statements it ran and how
+long they took, the slowest few of them, the time spent rendering
+templates and whatever is left over as Python time. Template time does not
+include the queries a template triggers (a lazy ``task.assigned_worker``,
+say); those count as SQL.
+
+When the request ends the profile is logged as one JSON line on the
+``app.perf`` logger, at WARNING when it ran more than
+``PERF_QUERY_THRESHOLD`` statements, and added to per-endpoint totals that
+managers can read at ``/__perf`` (or ``/__perf?format=json``).
+"""
+import json
+import logging
+import threading
+import time
+from collections import deque
+from flask import (abort, before_render_template, current_app, g, has_request_context, jsonify, render_template, request,
+                   template_rendered)
+from flask_login import current_user, login_required
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+_STARTED_KEY = 'perf_started'
+
+
+class RequestProfile:
+    def __init__(self, endpoint, method, path, slowest=5):
+        self.endpoint = endpoint
+        self.method = method
+        self.path = path
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.sql_seconds = 0.0
+        self.template_seconds = 0.0
+        self.slowest = []
+        self._keep = slowest
+        self._templates = []
+        self._template_sql = 0.0
+
+    def query(self, statement, seconds):
+        self.queries += 1
+        self.sql_seconds += seconds
+        if self._templates:
+            self._template_sql += seconds
+        if len(self.slowest) < self._keep or seconds > self.slowest[-1][0]:
+            self.slowest.append((seconds, statement))
+            self.slowest.sort(key=lambda item: item[0], reverse=True)
+            del self.slowest[self._keep:]
+
+    def template_started(self):
+        self._templates.append((time.perf_counter(), self._template_sql))
+
+    def template_finished(self):
+        if not self._templates:
+            return
+        started, sql_before = self._templates.pop()
+        if not self._templates:
+            self.template_seconds += time.perf_counter() - started - (self._template_sql - sql_before)
+
+    def finish(self, status, threshold):
+        total = time.perf_counter() - self.started
+        return {
+            'endpoint': self.endpoint,
+            'method': self.method,
+            'path': self.path,
+            'status': status,
+            'queries': self.queries,
+            'over_threshold': self.queries > threshold,
+            'total_ms': round(total * 1000, 2),
+            'sql_ms': round(self.sql_seconds * 1000, 2),
+            'template_ms': round(self.template_seconds * 1000, 2),
+            'python_ms': round(max(total - self.sql_seconds - self.template_seconds, 0) * 1000, 2),
+            'slowest': [{'ms': round(seconds * 1000, 2), 'statement': statement} for seconds, statement in self.slowest],
+        }
+
+
+class PerfStats:
+    """Per-endpoint totals plus the most recent requests that went over the query threshold."""
+
+    def __init__(self, history=50):
+        self._lock = threading.Lock()
+        self._endpoints = {}
+        self.flagged = deque(maxlen=history)
+
+    def add(self, record):
+        with self._lock:
+            totals = self._endpoints.setdefault(record['endpoint'], {
+                'requests': 0, 'flagged': 0, 'queries': 0, 'max_queries': 0,
+                'total_ms': 0.0, 'sql_ms': 0.0, 'template_ms': 0.0, 'python_ms': 0.0,
+            })
+            totals['requests'] += 1
+            totals['flagged'] += record['over_threshold']
+            totals['queries'] += record['queries']
+            totals['max_queries'] = max(totals['max_queries'], record['queries'])
+            for key in ('total_ms', 'sql_ms', 'template_ms', 'python_ms'):
+                totals[key] += record[key]
+            if record['over_threshold']:
+                self.flagged.appendleft(record)
+
+    def endpoints(self):
+        """Average per-request figures for every endpoint, the most queries per request first."""
+        with self._lock:
+            rows = []
+            for endpoint, totals in self._endpoints.items():
+                requests = totals['requests']
+                row = {'endpoint': endpoint, 'requests': requests, 'flagged': totals['flagged'],
+                       'max_queries': totals['max_queries'], 'avg_queries': round(totals['queries'] / requests, 1)}
+                for key in ('total_ms', 'sql_ms', 'template_ms', 'python_ms'):
+                    row[f'avg_{key}'] = round(totals[key] / requests, 2)
+                rows.append(row)
+        return sorted(rows, key=lambda row: (row['avg_queries'], row['avg_total_ms']), reverse=True)
+
+    def reset(self):
+        with self._lock:
+            self._endpoints.clear()
+            self.flagged.clear()
+
+
+def _profile():
+    if has_request_context():
+        return g.get('perf')
+    return None
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _profile() is not None:
+        conn.info.setdefault(_STARTED_KEY, []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = _profile()
+    started = conn.info.get(_STARTED_KEY)
+    if profile is not None and started:
+        profile.query(statement, time.perf_counter() - started.pop())
+
+
+def _handle_error(exception_context):
+    started = exception_context.connection.info.get(_STARTED_KEY) if exception_context.connection else None
+    if started:
+        started.pop()
+
+
+def _before_render(app, template, context, **extra):
+    profile = _profile()
+    if profile is not None:
+        profile.template_started()
+
+
+def _rendered(app, template, context, **extra):
+    profile = _profile()
+    if profile is not None:
+        profile.template_finished()
+
+
+def _start():
+    if request.endpoint in (None, 'static', 'perf_report'):
+        return
+    g.perf = RequestProfile(request.endpoint, request.method, request.path,
+                            slowest=current_app.config.get('PERF_SLOWEST_STATEMENTS', 5))
+
+
+def _finish(response):
+    profile = g.pop('perf', None)
+    if profile is None:
+        return response
+    record = profile.finish(response.status_code, current_app.config.get('PERF_QUERY_THRESHOLD', 20))
+    current_app.extensions['perf'].add(record)
+    logger.log(logging.WARNING if record['over_threshold'] else logging.INFO, json.dumps(record))
+    return response
+
+
+@login_required
+def perf_report():
+    if not current_user.is_manager:
+        abort(403)
+    stats = current_app.extensions['perf']
+    if request.method == 'POST':
+        stats.reset()
+    threshold = current_app.config.get('PERF_QUERY_THRESHOLD', 20)
+    if request.args.get('format') == 'json':
+        return jsonify({'threshold': threshold, 'endpoints': stats.endpoints(), 'flagged': list(stats.flagged)})
+    return render_template('perf.html', threshold=threshold, endpoints=stats.endpoints(), flagged=list(stats.flagged))
+
+
+def init_app(app):
+    if not app.config.get('PERF_ENABLED'):
+        return
+    app.extensions['perf'] = PerfStats(history=app.config.get('PERF_HISTORY', 50))
+    # On the Engine class so that every engine is covered, once however many apps are
+    # created; outside a profiled request the listeners do nothing.
+    if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+        event.listen(Engine, 'handle_error', _handle_error)
+    before_render_template.connect(_before_render, app)
+    template_rendered.connect(_rendered, app)
+    app.before_request(_start)
+    app.after_request(_finish)
+    app.add_url_rule('/__perf', 'perf_report', perf_report, methods=['GET', 'POST'])
@@ -0,0 +1,127 @@
+"""EXPLAIN QUERY PLAN guard for the queries the views run on every request.
+
+``check_query_plans`` runs every statement below through SQLite's planner
+and reports the ones that fall back to a full table scan, so a dropped or
+mismatched index is caught before it reaches production. It runs in the
+test suite (tests/test_query_plans.py) and as ``flask check-query-plans``
+against a real database.
+
+The view statements are not copied here: each ``VIEW_REQUESTS`` entry calls
+the view itself as a manager or a worker and records every SELECT it
+issues, so a changed filter or ordering in app/views.py is checked as it
+is. ``job_queries`` holds the shapes of the background jobs' reads, which
+can't be run for their plans since the jobs also write.
+"""
+from contextlib import contextmanager
+from datetime import date
+from flask import current_app
+from flask_login import login_user
+from sqlalchemy import event, select
+from werkzeug.exceptions import HTTPException
+from app import db
+from app.models import Notification, Task, User
+
+# Any id works here; the planner only cares about the shape of the predicate.
+SAMPLE_ID = 1
+
+# name: (endpoint, view arguments, query string, as a manager)
+VIEW_REQUESTS = {
+    'manager dashboard': ('main.manager_dashboard', {}, {}, True),
+    'worker dashboard': ('main.worker_dashboard', {}, {}, False),
+    'notification inbox': ('main.notifications', {}, {}, False),
+    'notification inbox by type': ('main.notifications', {}, {'type': 'task_assigned'}, False),
+    'all notifications': ('main.notifications', {}, {'show': 'all'}, False),
+    'kanban board (manager)': ('main.kanban_board', {}, {}, True),
+    'kanban board (worker)': ('main.kanban_board', {}, {}, False),
+    'kanban column page (worker)': ('main.kanban_column_feed', {'status': 'Assigned'}, {'cursor': 100}, False),
+    'task list (manager)': ('main.task_list', {}, {}, True),
+    'task list by deadline': ('main.task_list', {}, {'sort': 'deadline'}, True),
+    'task list by status': ('main.task_list', {}, {'status': 'Assigned'}, True),
+    'task list (worker)': ('main.task_list', {}, {}, False),
+    'submitted tasks (manager)': ('main.submitted_tasks', {}, {}, True),
+    'submitted tasks (worker)': ('main.submitted_tasks', {}, {}, False),
+    'client list (manager)': ('main.clients', {}, {}, True),
+    'client list (worker)': ('main.clients', {}, {}, False),
+    'client list by status': ('main.clients', {}, {'status': 'Active'}, True),
+    'client tasks': ('main.client_section_feed', {'client_id': SAMPLE_ID, 'section': 'tasks'}, {}, True),
+    'client onboarding tasks': ('main.client_section_feed', {'client_id': SAMPLE_ID, 'section': 'onboarding_tasks'}, {}, True),
+    'client content ideas': ('main.client_section_feed', {'client_id': SAMPLE_ID, 'section': 'content_ideas'}, {}, True),
+    'client metrics': ('main.client_section_feed', {'client_id': SAMPLE_ID, 'section': 'metrics'}, {}, True),
+    'client analytics': ('main.client_analytics', {'client_id': SAMPLE_ID}, {'start': '2024-01-01', 'end': '2024-03-31'}, True),
+    'submitted tasks report': ('main.submitted_tasks_report', {}, {}, True),
+}
+
+
+@contextmanager
+def _recording(statements):
+    def record(connection, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT'):
+            statements.append((statement, parameters))
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        yield
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+
+
+def view_statements(endpoint, view_args, query_string, is_manager):
+    """Call a view as a sample manager or worker; returns the ``(sql, parameters)`` of every SELECT it ran."""
+    # Not in the session: nothing the view does can write it back.
+    user = User(id=SAMPLE_ID, email='sample@example.com', name='Sample', is_manager=is_manager)
+    cache = current_app.extensions['unread_counts']
+    statements = []
+    with current_app.test_request_context(query_string=query_string):
+        login_user(user)
+        # The unread badge count is otherwise served from the cache without a query.
+        cache.delete(SAMPLE_ID)
+        with _recording(statements):
+            try:
+                current_app.view_functions[endpoint](**view_args)
+            except HTTPException:
+                pass
+        db.session.rollback()
+    return statements
+
+
+def job_queries():
+    return {
+        'notification retention batch': select(Notification.id).where(
+            Notification.read == True, Notification.timestamp < date(2024, 1, 1)).limit(1000),
+        'notification digest groups': select(Notification.user_id, Notification.type).where(
+            Notification.read == False, Notification.timestamp < date(2024, 1, 1)).group_by(
+            Notification.user_id, Notification.type),
+        'deadline window': select(Task.id).where(
+            Task.status.in_(('Assigned', 'In Progress')), Task.deadline > date(2024, 1, 1),
+            Task.deadline <= date(2024, 1, 2)).order_by(Task.deadline, Task.id).limit(500),
+    }
+
+
+def explain(sql, parameters=()):
+    with db.engine.connect() as connection:
+        return [row[-1] for row in connection.exec_driver_sql('EXPLAIN QUERY PLAN ' + sql, parameters)]
+
+
+def _compiled(statement):
+    return str(statement.compile(dialect=db.engine.dialect, compile_kwargs={'literal_binds': True})), ()
+
+
+def is_full_scan(detail):
+    # "SCAN task" is a table scan; "SCAN task USING [COVERING] INDEX ..." is not, and neither are
+    # the constant row and subquery SQLAlchemy renders for an empty IN list.
+    return (detail.startswith('SCAN ') and ' USING ' not in detail
+            and detail != 'SCAN CONSTANT ROW' and not detail.startswith('SCAN (subquery'))
+
+
+def hot_queries():
+    """``{name: [(sql, parameters), ...]}`` for every view request and job query."""
+    queries = {name: view_statements(*request) for name, request in VIEW_REQUESTS.items()}
+    queries.update((name, [_compiled(statement)]) for name, statement in job_queries().items())
+    return queries
+
+
+def check_query_plans():
+    """Return ``{name: plan}`` for every hot query, plus the names that scan a whole table."""
+    plans = {name: [detail for sql, parameters in statements for detail in explain(sql, parameters)]
+             for name, statements in hot_queries().items()}
+    offenders = [name for name, plan in plans.items() if any(is_full_scan(detail) for detail in plan)]
+    return plans, offenders
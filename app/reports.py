@@ -0,0 +1,225 @@
+"""Submitted-tasks SLA report, pre-aggregated as tasks complete.
+
+Every completion adds the task to three weekly ``TaskRollup`` rows (its
+worker, its client and the agency-wide ``'all'`` row) and its cycle time
+(``in_progress_time`` to ``completion_time``) and lead time
+(``created_at`` to ``completion_time``) to the matching ``DurationBucket``
+histograms, in the caller's transaction. A task that leaves Completed is
+subtracted the same way. The report only sums those rows over the weeks
+asked for, so it costs the same however many tasks there are, and reads
+p50/p90 off the merged ``LogHistogram``s.
+
+Each worker also has an all-time ``WorkerDuration`` row and cycle-time
+histogram, which ``worker_stats`` reads for the worker dashboard together
+with the weekly rollups of the last few complete weeks for throughput.
+
+``rebuild_reports`` recomputes all of these tables from the task table.
+"""
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import func, insert, select
+from app import db
+from app.database import increment
+from app.models import Client, DurationBucket, Task, TaskRollup, User, WorkerDuration, WorkerDurationBucket
+from app.sketch import LogHistogram, bucket
+
+ALL = 0
+QUANTILES = (0.5, 0.9)
+THROUGHPUT_WEEKS = 4
+COMPLETED_TASK_COLUMNS = ('worker_id', 'client_id', 'created_at', 'in_progress_time', 'completion_time', 'deadline')
+
+
+def _utc(moment):
+    # Stamped values are aware, values read back from SQLite are naive UTC.
+    if moment is not None and moment.tzinfo is not None:
+        return moment.astimezone(timezone.utc).replace(tzinfo=None)
+    return moment
+
+
+def week_of(moment):
+    day = _utc(moment).date()
+    return day - timedelta(days=day.weekday())
+
+
+def _seconds(start, end):
+    if start is None or end is None:
+        return None
+    return max((_utc(end) - _utc(start)).total_seconds(), 0.0)
+
+
+def observations(task):
+    """``(week, on_time, {metric: seconds or None})`` for a completed ``task`` (or result row)."""
+    completed = task.completion_time
+    on_time = task.deadline is None or _utc(completed) <= _utc(task.deadline)
+    durations = {
+        'cycle': _seconds(task.in_progress_time, completed),
+        'lead': _seconds(task.created_at, completed),
+    }
+    return week_of(completed), on_time, durations
+
+
+def _scopes(task):
+    return (('worker', task.worker_id), ('client', task.client_id), ('all', ALL))
+
+
+def record_completion(task, sign=1):
+    """Add a completed task to the rollups, or take it out again with ``sign=-1``."""
+    if task.completion_time is None:
+        return
+    week, on_time, durations = observations(task)
+    for dimension, scope_id in _scopes(task):
+        key = {'dimension': dimension, 'scope_id': scope_id, 'week': week}
+        increment(TaskRollup, key, {
+            'completed': sign,
+            'on_time': sign if on_time else 0,
+            'cycle_seconds': sign * (durations['cycle'] or 0),
+            'lead_seconds': sign * (durations['lead'] or 0),
+        })
+        for metric, seconds in durations.items():
+            if seconds is not None:
+                increment(DurationBucket, dict(key, metric=metric, bucket=bucket(seconds)), {'count': sign})
+    if task.worker_id is not None:
+        cycle = durations['cycle']
+        increment(WorkerDuration, {'worker_id': task.worker_id}, {
+            'completed': sign,
+            'measured': sign if cycle is not None else 0,
+            'cycle_seconds': sign * (cycle or 0),
+        })
+        if cycle is not None:
+            increment(WorkerDurationBucket, {'worker_id': task.worker_id, 'bucket': bucket(cycle)}, {'count': sign})
+
+
+def _summaries(dimension, group, start):
+    """``{group value: summary}`` for one dimension, summed over the weeks since ``start``."""
+    group_column = getattr(TaskRollup, group)
+    criteria = [TaskRollup.dimension == dimension] + ([TaskRollup.week >= start] if start else [])
+    totals = db.session.execute(
+        select(group_column, func.sum(TaskRollup.completed), func.sum(TaskRollup.on_time),
+               func.sum(TaskRollup.cycle_seconds), func.sum(TaskRollup.lead_seconds))
+        .where(*criteria).group_by(group_column)
+    ).all()
+    histograms = defaultdict(LogHistogram)
+    bucket_group = getattr(DurationBucket, group)
+    bucket_criteria = [DurationBucket.dimension == dimension] + ([DurationBucket.week >= start] if start else [])
+    for value, metric, index, count in db.session.execute(
+        select(bucket_group, DurationBucket.metric, DurationBucket.bucket, func.sum(DurationBucket.count))
+        .where(*bucket_criteria).group_by(bucket_group, DurationBucket.metric, DurationBucket.bucket)
+    ):
+        histograms[value, metric].counts[index] = count
+
+    summaries = {}
+    for value, completed, on_time, cycle_seconds, lead_seconds in totals:
+        if not completed:
+            continue
+        summary = {'completed': completed, 'on_time_rate': on_time / completed}
+        for metric, seconds in (('cycle', cycle_seconds), ('lead', lead_seconds)):
+            histogram = histograms[value, metric]
+            measured = len(histogram)
+            summary[f'{metric}_mean'] = seconds / measured if measured else None
+            for q in QUANTILES:
+                summary[f'{metric}_p{int(q * 100)}'] = histogram.quantile(q)
+        summaries[value] = summary
+    return summaries
+
+
+def report(weeks=None, today=None):
+    """Per-worker, per-client and per-week summaries over the last ``weeks`` weeks (all time if None)."""
+    start = week_of(today or datetime.now(timezone.utc)) - timedelta(weeks=weeks - 1) if weeks else None
+    workers = _summaries('worker', 'scope_id', start)
+    clients = _summaries('client', 'scope_id', start)
+    names = {
+        'worker': dict(db.session.execute(select(User.id, User.name).where(User.id.in_(workers))).all()),
+        'client': dict(db.session.execute(select(Client.id, Client.name).where(Client.id.in_(clients))).all()),
+    }
+    return {
+        'start': start.isoformat() if start else None,
+        'workers': [dict(summary, id=scope_id, name=names['worker'].get(scope_id)) for scope_id, summary in workers.items()],
+        'clients': [dict(summary, id=scope_id, name=names['client'].get(scope_id)) for scope_id, summary in clients.items()],
+        'weeks': [dict(summary, week=week.isoformat()) for week, summary in sorted(_summaries('all', 'week', start).items(), reverse=True)],
+    }
+
+
+def worker_stats(worker_id, weeks=THROUGHPUT_WEEKS, today=None):
+    """All-time cycle time mean/p50/p90 (seconds) of a worker and its completions per week lately.
+
+    Throughput averages the ``weeks`` complete weeks before the current one,
+    so a Monday morning doesn't count as a whole week with no completions.
+    """
+    totals = db.session.get(WorkerDuration, worker_id)
+    histogram = LogHistogram(db.session.execute(
+        select(WorkerDurationBucket.bucket, WorkerDurationBucket.count).where(WorkerDurationBucket.worker_id == worker_id)
+    ).all())
+    end = week_of(today or datetime.now(timezone.utc))
+    recent = db.session.execute(
+        select(func.sum(TaskRollup.completed))
+        .where(TaskRollup.dimension == 'worker', TaskRollup.scope_id == worker_id,
+               TaskRollup.week >= end - timedelta(weeks=weeks), TaskRollup.week < end)
+    ).scalar()
+    stats = {
+        'completed': totals.completed if totals else 0,
+        'cycle_mean': totals.cycle_seconds / totals.measured if totals and totals.measured else None,
+        'throughput_weeks': weeks,
+        'throughput_per_week': (recent or 0) / weeks,
+    }
+    for q in QUANTILES:
+        stats[f'cycle_p{int(q * 100)}'] = histogram.quantile(q)
+    return stats
+
+
+def aggregate(tasks):
+    """Rollup, histogram and worker duration rows for completed ``tasks``, as ``{table name: [row, ...]}``.
+
+    ``tasks`` are rows with the ``COMPLETED_TASK_COLUMNS`` of tasks that have a completion time.
+    """
+    rollups = defaultdict(Counter)
+    buckets = Counter()
+    workers = defaultdict(Counter)
+    worker_buckets = Counter()
+    for task in tasks:
+        week, on_time, durations = observations(task)
+        for dimension, scope_id in _scopes(task):
+            rollup = rollups[dimension, scope_id, week]
+            rollup['completed'] += 1
+            rollup['on_time'] += on_time
+            rollup['cycle_seconds'] += durations['cycle'] or 0
+            rollup['lead_seconds'] += durations['lead'] or 0
+            for metric, seconds in durations.items():
+                if seconds is not None:
+                    buckets[dimension, scope_id, week, metric, bucket(seconds)] += 1
+        if task.worker_id is not None:
+            cycle = durations['cycle']
+            worker = workers[task.worker_id]
+            worker['completed'] += 1
+            worker['measured'] += cycle is not None
+            worker['cycle_seconds'] += cycle or 0
+            if cycle is not None:
+                worker_buckets[task.worker_id, bucket(cycle)] += 1
+    return {
+        TaskRollup.__tablename__: [dict(totals, dimension=dimension, scope_id=scope_id, week=week)
+                                   for (dimension, scope_id, week), totals in rollups.items()],
+        DurationBucket.__tablename__: [
+            {'dimension': dimension, 'scope_id': scope_id, 'week': week, 'metric': metric, 'bucket': index, 'count': count}
+            for (dimension, scope_id, week, metric, index), count in buckets.items()],
+        WorkerDuration.__tablename__: [dict(totals, worker_id=worker_id) for worker_id, totals in workers.items()],
+        WorkerDurationBucket.__tablename__: [{'worker_id': worker_id, 'bucket': index, 'count': count}
+                                             for (worker_id, index), count in worker_buckets.items()],
+    }
+
+
+def rebuild_reports(batch_size=1000):
+    """Recompute the rollup, worker duration and histogram tables from the completed tasks.
+
+    Returns the number of tasks aggregated.
+    """
+    statement = select(*(getattr(Task, column) for column in COMPLETED_TASK_COLUMNS)).where(
+        Task.status == 'Completed', Task.completion_time.isnot(None))
+    tables = aggregate(db.session.execute(statement.execution_options(yield_per=batch_size)))
+    models = (TaskRollup, DurationBucket, WorkerDuration, WorkerDurationBucket)
+    for model in reversed(models):
+        db.session.execute(model.__table__.delete())
+    for model in models:
+        rows = tables[model.__tablename__]
+        for offset in range(0, len(rows), batch_size):
+            db.session.execute(insert(model), rows[offset:offset + batch_size])
+    db.session.commit()
+    return sum(row['completed'] for row in tables[TaskRollup.__tablename__] if row['dimension'] == 'all')
@@ -0,0 +1,128 @@
+"""Notification retention: archiving old read notifications and digesting old unread ones.
+
+``prune_notifications`` runs in two passes. Each pass works in batches of
+``NOTIFICATION_RETENTION_BATCH_SIZE`` rows, and every batch is its own
+short transaction, so other writers wait a few milliseconds at most rather
+than behind one huge DELETE.
+
+* Read notifications older than ``NOTIFICATION_RETENTION_DAYS`` are moved
+  to the ``notification_archive`` table (``NOTIFICATION_RETENTION_MODE =
+  'archive'``) or deleted outright (``'delete'``).
+* When a user has at least ``NOTIFICATION_DIGEST_MIN`` unread notifications
+  of one type older than ``NOTIFICATION_DIGEST_DAYS``, they are replaced by
+  one unread ``digest`` notification that counts them and quotes the
+  latest. The originals are archived or deleted the same way, in batches:
+  the first batch creates the digest and later ones update its count, so
+  a run stopped part way still leaves one digest counting what it removed.
+  A batch's rows are locked while it runs where the database supports
+  ``FOR UPDATE``, and only the ones still unread when they are removed are
+  counted, so a notification read in the meantime is never digested.
+
+The job runs every ``NOTIFICATION_RETENTION_INTERVAL`` seconds on the
+scheduler (app/scheduler.py) and on demand with ``flask prune-notifications``.
+"""
+import time
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import delete, func, insert, select, update
+from app import db, scheduler
+from app.models import Notification, NotificationArchive
+from app.notifications import track_unread
+
+DIGEST_TYPE = 'digest'
+_ARCHIVED_COLUMNS = ('user_id', 'message', 'type', 'timestamp', 'read')
+
+
+def init_app(app):
+    scheduler.add_job(app, 'notification-retention', prune_notifications,
+                      app.config.get('NOTIFICATION_RETENTION_INTERVAL', 0))
+
+
+def prune_notifications(now=None, retention_days=None, digest_days=None, mode=None):
+    """Run both passes; returns ``{'removed': read rows, 'collapsed': unread rows, 'digests': digests}``."""
+    config = current_app.config
+    now = now or datetime.utcnow()
+    retention_days = config['NOTIFICATION_RETENTION_DAYS'] if retention_days is None else retention_days
+    digest_days = config['NOTIFICATION_DIGEST_DAYS'] if digest_days is None else digest_days
+    mode = mode or config['NOTIFICATION_RETENTION_MODE']
+    if mode not in ('archive', 'delete'):
+        raise ValueError(f'unknown notification retention mode {mode!r}')
+    removed = remove_read(now - timedelta(days=retention_days), mode)
+    collapsed, digests = collapse_unread(now - timedelta(days=digest_days), mode)
+    return {'removed': removed, 'collapsed': collapsed, 'digests': digests}
+
+
+def remove_read(cutoff, mode):
+    """Archive or delete read notifications from before ``cutoff``; returns how many."""
+    removed = 0
+    while True:
+        ids = db.session.scalars(select(Notification.id).where(
+            Notification.read == True, Notification.timestamp < cutoff).limit(_batch_size())).all()
+        if not ids:
+            return removed
+        removed += _remove(ids, mode, Notification.read == True)
+        db.session.commit()
+        _pause()
+
+
+def collapse_unread(cutoff, mode):
+    """Replace runs of old unread notifications of one type with digests; returns (collapsed, digests)."""
+    minimum = current_app.config['NOTIFICATION_DIGEST_MIN']
+    groups = db.session.execute(
+        select(Notification.user_id, Notification.type)
+        .where(Notification.read == False, Notification.timestamp < cutoff, Notification.type != DIGEST_TYPE)
+        .group_by(Notification.user_id, Notification.type)
+        .having(func.count() >= minimum)
+    ).all()
+    db.session.commit()
+    collapsed = digests = 0
+    for user_id, type in groups:
+        digest_id, total, latest = None, 0, None
+        while True:
+            rows = db.session.execute(
+                select(Notification.id, Notification.message, Notification.timestamp)
+                .where(Notification.user_id == user_id, Notification.read == False,
+                       Notification.timestamp < cutoff, Notification.type == type)
+                .order_by(Notification.timestamp.desc()).limit(_batch_size()).with_for_update()
+            ).all()
+            # Once the group has a digest, every remaining row, however few, is folded into it.
+            if not rows or (digest_id is None and len(rows) < minimum):
+                db.session.commit()
+                break
+            # The user may have read some of them since; only the ones still unread are digested.
+            removed = _remove([row.id for row in rows], mode, Notification.read == False)
+            if removed:
+                total += removed
+                latest = latest or rows[0]
+                message = f'{total} {type.replace("_", " ")} notifications, the latest: {latest.message}'[:250]
+                if digest_id is None:
+                    digest_id = db.session.execute(insert(Notification).values(
+                        user_id=user_id, type=DIGEST_TYPE, message=message, timestamp=latest.timestamp, read=False)
+                    ).inserted_primary_key[0]
+                    track_unread(user_id, 1)
+                    digests += 1
+                else:
+                    db.session.execute(update(Notification).where(Notification.id == digest_id).values(message=message))
+                track_unread(user_id, -removed)
+                collapsed += removed
+            db.session.commit()
+            _pause()
+    return collapsed, digests
+
+
+def _remove(ids, mode, *criteria):
+    """Archive or delete the notifications in ``ids`` that still match ``criteria``; returns how many."""
+    if mode == 'archive':
+        columns = [Notification.id] + [getattr(Notification, column) for column in _ARCHIVED_COLUMNS]
+        db.session.execute(insert(NotificationArchive).from_select(
+            ('notification_id',) + _ARCHIVED_COLUMNS, select(*columns).where(Notification.id.in_(ids), *criteria)))
+    return db.session.execute(delete(Notification).where(Notification.id.in_(ids), *criteria)).rowcount
+
+
+def _batch_size():
+    return current_app.config['NOTIFICATION_RETENTION_BATCH_SIZE']
+
+
+def _pause():
+    # Leaves a gap between batches for the requests waiting on the write lock.
+    time.sleep(current_app.config['NOTIFICATION_RETENTION_PAUSE'])
@@ -0,0 +1,177 @@
+"""Synthetic agency data for load tests and benchmarks (``flask generate-data``).
+
+Fills an empty database with users, clients, tasks, onboarding tasks,
+content ideas, metrics and notifications in bulk inserts, with skews like
+the real thing: a few busy workers and clients, most tasks long completed,
+most notifications read. Every user's password is ``PASSWORD``; the first
+manager is ``manager1@example.com`` and the first worker
+``worker1@example.com``. The dashboard counters, search index and report
+rollups are rebuilt at the end since bulk inserts bypass them.
+"""
+import bisect
+import itertools
+import random
+from datetime import datetime, timedelta
+from sqlalchemy import func, insert, select
+from werkzeug.security import generate_password_hash
+from app import db
+from app.models import Client, ContentIdea, Metric, Notification, OnboardingTask, Task, User
+
+PASSWORD = 'benchmark'
+MANAGER_SHARE = 0.1
+DEFAULT_VOLUMES = {
+    'users': 500,
+    'clients': 20000,
+    'tasks': 1000000,
+    'onboarding_tasks': 100000,
+    'content_ideas': 100000,
+    'metrics': 5000000,
+    'notifications': 10000000,
+}
+
+CATEGORIES = ['Restaurant', 'Bakery', 'Fitness', 'Fashion', 'Real Estate', 'Beauty', 'Coffee', 'Dental', 'Retail', 'Travel']
+CLIENT_STATUSES = (['Active'] * 7) + ['Inactive', 'Prospect', 'Paused']
+PLATFORMS = ['Instagram', 'TikTok', 'Facebook', 'YouTube', 'LinkedIn']
+ACTIONS = ['Write captions for', 'Film reel for', 'Design carousel for', 'Schedule posts for', 'Report on', 'Plan launch campaign for']
+NOTIFICATION_TYPES = ['task_assigned', 'task_status_changed', 'task_submitted', 'client_added', 'metrics_imported']
+HISTORY_DAYS = 730
+
+
+def _skew(ids, exponent=0.8):
+    """Cumulative Zipf-like weights for ``ids``: the first few are picked far more often than the rest."""
+    return list(ids), list(itertools.accumulate(1 / (rank + 1) ** exponent for rank in range(len(ids))))
+
+
+def _pick(generator, skew):
+    ids, cum_weights = skew
+    return ids[bisect.bisect(cum_weights, generator.random() * cum_weights[-1])]
+
+
+def _stream(model, count, make_row, batch_size, progress):
+    batch = []
+    for number in range(1, count + 1):
+        batch.append(make_row(number))
+        if len(batch) >= batch_size:
+            db.session.execute(insert(model), batch)
+            batch = []
+            progress(model.__tablename__, number)
+    if batch:
+        db.session.execute(insert(model), batch)
+    db.session.commit()
+    progress(model.__tablename__, count)
+
+
+def _ids(model, *criteria):
+    return db.session.scalars(select(model.id).where(*criteria).order_by(model.id)).all()
+
+
+def generate(volumes=None, seed=1, batch_size=10000, now=None, progress=lambda table, rows: None):
+    """Fill an empty database; returns ``{table: rows inserted}``.
+
+    ``volumes`` overrides entries of ``DEFAULT_VOLUMES``.
+    """
+    if db.session.scalar(select(func.count()).select_from(User)):
+        raise ValueError('the database already has users; generate data into a scratch database')
+    volumes = dict(DEFAULT_VOLUMES, **(volumes or {}))
+    generator = random.Random(seed)
+    now = now or datetime.utcnow().replace(microsecond=0)
+    epoch = now - timedelta(days=HISTORY_DAYS)
+
+    def moment():
+        # Weighted towards the recent past, as an agency grows.
+        return epoch + timedelta(seconds=int(HISTORY_DAYS * 86400 * generator.random() ** 0.5))
+
+    managers = max(1, int(volumes['users'] * MANAGER_SHARE))
+    workers = max(1, volumes['users'] - managers)
+    password = generate_password_hash(PASSWORD, method='pbkdf2:sha256')
+    users = [{'email': f'manager{number}@example.com', 'name': f'Manager {number}',
+              'password': password, 'is_manager': True} for number in range(1, managers + 1)]
+    users += [{'email': f'worker{number}@example.com', 'name': f'Worker {number}',
+               'password': password, 'is_manager': False} for number in range(1, workers + 1)]
+    for offset in range(0, len(users), batch_size):
+        db.session.execute(insert(User), users[offset:offset + batch_size])
+    db.session.commit()
+    progress('user', len(users))
+    # Ids come from the database so that its sequences stay ahead of them.
+    manager_ids = _ids(User, User.is_manager == True)
+    worker_ids = _ids(User, User.is_manager == False)
+    user_ids = manager_ids + worker_ids
+    busy_workers = _skew(worker_ids)
+
+    def client(number):
+        category = generator.choice(CATEGORIES)
+        return {
+            'user_id': generator.choice(user_ids), 'name': f'{category} Client {number}',
+            'contact_number': f'+1555{number:07d}', 'business_category': category,
+            'social_media_handles': f'@client{number}', 'goals': f'Grow {generator.choice(PLATFORMS)} reach',
+            'specific_requests': '', 'status': generator.choice(CLIENT_STATUSES), 'created_at': moment(),
+        }
+
+    _stream(Client, volumes['clients'], client, batch_size, progress)
+    client_ids = _ids(Client)
+    busy_clients = _skew(client_ids)
+
+    def task(number):
+        created_at = moment()
+        age = (now - created_at).days
+        # Old tasks are nearly all done; the last few weeks hold the open work.
+        status = 'Completed' if age > 30 or generator.random() < 0.4 else generator.choice(['Assigned', 'In Progress'])
+        client_id = _pick(generator, busy_clients)
+        row = {
+            'manager_id': generator.choice(manager_ids), 'worker_id': _pick(generator, busy_workers),
+            'client_id': client_id, 'task_description': f'{generator.choice(ACTIONS)} client {client_id}',
+            'deadline': created_at + timedelta(days=generator.randint(1, 21)), 'status': status,
+            'created_at': created_at, 'in_progress_time': None, 'completion_time': None,
+            'completion_description': None, 'completion_link': None,
+        }
+        if status != 'Assigned':
+            row['in_progress_time'] = created_at + timedelta(hours=generator.expovariate(1 / 24))
+        if status == 'Completed':
+            row['completion_time'] = row['in_progress_time'] + timedelta(hours=generator.lognormvariate(2.5, 1))
+            row['completion_description'] = 'Delivered and approved'
+            row['completion_link'] = f'https://example.com/deliverables/{number}'
+        return row
+
+    _stream(Task, volumes['tasks'], task, batch_size, progress)
+
+    _stream(OnboardingTask, volumes['onboarding_tasks'], lambda number: {
+        'client_id': generator.choice(client_ids), 'task_name': f'Onboarding step {number % 8 + 1}',
+        'responsible': generator.choice(['Manager', 'Worker', 'Client']),
+        'deadline': (now + timedelta(days=generator.randint(-60, 60))).strftime('%Y-%m-%d'),
+    }, batch_size, progress)
+
+    _stream(ContentIdea, volumes['content_ideas'], lambda number: {
+        'client_id': generator.choice(client_ids), 'idea_source': generator.choice(PLATFORMS),
+        'description': f'{generator.choice(["Behind the scenes", "Customer story", "Trend remix", "Tutorial"])} idea {number}',
+        'link': f'https://example.com/ideas/{number}', 'sound': '', 'status': generator.choice(['New', 'Approved', 'Posted']),
+    }, batch_size, progress)
+
+    def metric(number):
+        posted_on = moment().date()
+        views = int(generator.lognormvariate(7, 1.5))
+        return {
+            'client_id': _pick(generator, busy_clients), 'platform': generator.choice(PLATFORMS),
+            'post_date': posted_on.isoformat(), 'posted_on': posted_on, 'views': views,
+            'likes': int(views * generator.uniform(0.01, 0.1)), 'comments': int(views * generator.uniform(0, 0.01)),
+            'shares': int(views * generator.uniform(0, 0.005)),
+        }
+
+    _stream(Metric, volumes['metrics'], metric, batch_size, progress)
+
+    def notification(number):
+        timestamp = moment()
+        return {
+            'user_id': generator.choice(user_ids), 'message': f'Notification {number}',
+            'type': generator.choice(NOTIFICATION_TYPES), 'timestamp': timestamp,
+            'read': (now - timestamp).days > 7 or generator.random() < 0.5,
+        }
+
+    _stream(Notification, volumes['notifications'], notification, batch_size, progress)
+
+    from app.counters import rebuild_counters
+    from app.reports import rebuild_reports
+    from app.search import rebuild
+    rebuild_counters()
+    rebuild()
+    rebuild_reports()
+    return dict(volumes, users=len(users))
@@ -0,0 +1,84 @@
+"""In-process scheduler for periodic maintenance jobs.
+
+Subsystems register their jobs with ``add_job`` from their ``init_app``;
+each job runs every ``interval`` seconds in an app context on one daemon
+thread, so a job never overlaps with itself or with another job. A job
+that raises is logged and simply runs again at its next turn.
+
+With several worker processes every process would run every job, so the
+thread is only started when ``SCHEDULER_ENABLED`` is set, which is meant
+for single-process deployments. Otherwise run ``flask run-scheduler`` as
+one extra process, or call the jobs' own CLI commands from cron.
+"""
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class Job:
+    def __init__(self, name, function, interval):
+        self.name = name
+        self.function = function
+        self.interval = interval
+        self.next_run = time.monotonic() + interval
+        self.last_result = None
+
+
+class Scheduler:
+    def __init__(self, app):
+        self.app = app
+        self.jobs = []
+        self._stop = threading.Event()
+        self._thread = None
+
+    def add_job(self, name, function, interval):
+        """Call ``function()`` every ``interval`` seconds; an interval of 0 or less disables the job."""
+        if interval and interval > 0:
+            self.jobs.append(Job(name, function, interval))
+
+    def run_pending(self):
+        """Run every job that is due; returns the number of seconds until the next one."""
+        for job in self.jobs:
+            if time.monotonic() >= job.next_run:
+                self.run_job(job)
+                job.next_run = time.monotonic() + job.interval
+        return min((job.next_run for job in self.jobs), default=time.monotonic() + 60) - time.monotonic()
+
+    def run_job(self, job):
+        started = time.monotonic()
+        with self.app.app_context():
+            try:
+                job.last_result = job.function()
+            except Exception:
+                logger.exception('scheduled job %s failed', job.name)
+                return
+        logger.info('scheduled job %s finished in %.3fs: %s', job.name, time.monotonic() - started, job.last_result)
+
+    def run_forever(self):
+        while not self._stop.is_set():
+            self._stop.wait(max(0, self.run_pending()))
+
+    def start(self):
+        if self._thread is None and self.jobs:
+            self._thread = threading.Thread(target=self.run_forever, name='scheduler', daemon=True)
+            self._thread.start()
+
+    def shutdown(self, timeout=None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+
+def init_app(app):
+    app.extensions['scheduler'] = Scheduler(app)
+
+
+def add_job(app, name, function, interval):
+    app.extensions['scheduler'].add_job(name, function, interval)
+
+
+def start(app):
+    if app.config.get('SCHEDULER_ENABLED'):
+        app.extensions['scheduler'].start()
@@ -0,0 +1,384 @@
+"""Full-text search over clients, tasks and content ideas.
+
+Each searchable row becomes one document with a title (the field people
+search for most) and a body made of the other text fields. Two backends
+rank documents with BM25, titles weighing double:
+
+* ``'fts5'`` keeps the documents in the ``search_index`` SQLite FTS5
+  table. Mapper events rewrite a row's document in the same transaction
+  that changes it, so the index commits and rolls back with the data.
+* ``'memory'`` is a pure-Python inverted index for databases without
+  FTS5. It is built on the first search and kept current from the
+  changes of each committed session. Every process holds its own copy,
+  so changes committed by other processes only appear after a rebuild.
+
+``SEARCH_BACKEND`` picks one; ``'auto'`` (the default) uses FTS5 when the
+table exists. All query terms must match. A term that is a whole word in
+the index matches that word only; any other term of ``MIN_PREFIX`` or
+more characters matches as the start of a word, so half-typed words and
+parts of handles still find something. Expanding every term would make
+common words as slow as scanning the index.
+``flask rebuild-search-index`` repopulates either backend.
+"""
+import heapq
+import math
+import re
+import threading
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from flask import current_app, has_app_context
+from sqlalchemy import event, inspect, select, text
+from sqlalchemy.orm import object_session
+from app import db
+from app.models import Client, ContentIdea, Task
+
+FTS_TABLE = 'search_index'
+MIN_PREFIX = 3
+RANK_LIMIT = 2000
+TITLE_WEIGHT = 2.0
+BODY_WEIGHT = 1.0
+
+# kind -> (model, title field, body fields). The position of a kind is part of
+# the FTS rowid, so new kinds go at the end.
+SOURCES = {
+    'client': (Client, 'name', ('business_category', 'social_media_handles', 'goals')),
+    'task': (Task, 'task_description', ('completion_description',)),
+    'content_idea': (ContentIdea, 'description', ('idea_source',)),
+}
+KINDS = list(SOURCES)
+_MODEL_KINDS = {model: kind for kind, (model, _, _) in SOURCES.items()}
+
+_PENDING_KEY = 'search_pending'
+_TOKEN = re.compile(r'\w+', re.UNICODE)
+
+
+def tokenize(value):
+    return _TOKEN.findall((value or '').lower())
+
+
+def document(kind, row):
+    """``(title, body)`` text of ``row``, which may be a model instance or a result row."""
+    _, title_field, body_fields = SOURCES[kind]
+    body = ' '.join(getattr(row, field) or '' for field in body_fields)
+    return getattr(row, title_field) or '', body
+
+
+def rowid(kind, ref):
+    return ref * len(KINDS) + KINDS.index(kind)
+
+
+def from_rowid(value):
+    ref, position = divmod(value, len(KINDS))
+    return KINDS[position], ref
+
+
+def _is_word(connection, term):
+    return connection.execute(text(f'SELECT 1 FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :term LIMIT 1'),
+                              {'term': f'"{term}"'}).first() is not None
+
+
+def match_expression(connection, query):
+    """The FTS5 MATCH string for ``query``: every term quoted and required, unknown words as prefixes."""
+    return ' '.join(f'"{term}"*' if len(term) >= MIN_PREFIX and not _is_word(connection, term) else f'"{term}"'
+                    for term in tokenize(query))
+
+
+def create_fts_table(connection):
+    connection.execute(text(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+        "kind UNINDEXED, title, body, tokenize='unicode61 remove_diacritics 2', prefix='3')"))
+
+
+def fts_available(connection):
+    if connection.dialect.name != 'sqlite':
+        return False
+    return connection.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {'name': FTS_TABLE}).first() is not None
+
+
+def fts_write(connection, documents, replace=True):
+    """Replace the FTS documents for ``[(kind, ref, title, body)]``; ``title`` None deletes.
+
+    Pass ``replace=False`` when filling an empty table to skip the deletes.
+    """
+    if not documents:
+        return
+    if replace:
+        rowids = [{'rowid': rowid(kind, ref)} for kind, ref, _, _ in documents]
+        connection.execute(text(f'DELETE FROM {FTS_TABLE} WHERE rowid = :rowid'), rowids)
+    rows = [{'rowid': rowid(kind, ref), 'kind': kind, 'title': title, 'body': body}
+            for kind, ref, title, body in documents if title is not None]
+    if rows:
+        connection.execute(text(f'INSERT INTO {FTS_TABLE} (rowid, kind, title, body) '
+                                'VALUES (:rowid, :kind, :title, :body)'), rows)
+
+
+def fts_search(connection, query, kinds=None, limit=20, rank_limit=RANK_LIMIT):
+    """``[(kind, ref, score)]`` best first; higher scores are better matches.
+
+    Ranking scores every match, so a query matching more than
+    ``rank_limit`` documents (only words that are in most of them) returns
+    its newest matches instead, all with a score of 0.
+    """
+    expression = match_expression(connection, query)
+    if not expression:
+        return []
+    kinds = [kind for kind in kinds or KINDS if kind in SOURCES]
+    if not kinds:
+        return []
+    where = f'{FTS_TABLE} MATCH :expression'
+    parameters = {'expression': expression, 'limit': limit}
+    # kind is not indexed, so only filter on it when some kinds are left out.
+    if len(kinds) < len(KINDS):
+        where += f' AND kind IN ({", ".join(f":kind{i}" for i in range(len(kinds)))})'
+        parameters.update((f'kind{i}', kind) for i, kind in enumerate(kinds))
+    matches = connection.execute(text(f'SELECT count(*) FROM (SELECT rowid FROM {FTS_TABLE} WHERE {where} LIMIT :cap)'),
+                                 dict(parameters, cap=rank_limit + 1)).scalar()
+    if matches > rank_limit:
+        rows = connection.execute(text(f'SELECT rowid, 0.0 AS rank FROM {FTS_TABLE} WHERE {where} '
+                                       'ORDER BY rowid DESC LIMIT :limit'), parameters)
+    else:
+        # bm25() takes one weight per column, kind included, and returns lower-is-better scores.
+        rows = connection.execute(text(f'SELECT rowid, bm25({FTS_TABLE}, 0.0, {TITLE_WEIGHT}, {BODY_WEIGHT}) AS rank '
+                                       f'FROM {FTS_TABLE} WHERE {where} ORDER BY rank LIMIT :limit'), parameters)
+    return [from_rowid(row.rowid) + (-row.rank,) for row in rows]
+
+
+class InvertedIndex:
+    """In-memory BM25 index with the same document model as the FTS5 table."""
+
+    k1 = 1.2
+    b = 0.75
+
+    def __init__(self):
+        self.postings = defaultdict(dict)  # term -> {(kind, ref): weighted term frequency}
+        self.terms = {}  # (kind, ref) -> the document's terms, for removal
+        self.lengths = {}  # (kind, ref) -> weighted document length
+        self.total_length = 0.0
+        self._vocabulary = None
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.lengths)
+
+    def add(self, kind, ref, title, body):
+        key = (kind, ref)
+        self.remove(kind, ref)
+        frequencies = Counter()
+        for term in tokenize(title):
+            frequencies[term] += TITLE_WEIGHT
+        for term in tokenize(body):
+            frequencies[term] += BODY_WEIGHT
+        for term, frequency in frequencies.items():
+            if term not in self.postings:
+                self._vocabulary = None
+            self.postings[term][key] = frequency
+        self.terms[key] = list(frequencies)
+        self.lengths[key] = sum(frequencies.values())
+        self.total_length += self.lengths[key]
+
+    def remove(self, kind, ref):
+        key = (kind, ref)
+        for term in self.terms.pop(key, ()):
+            documents = self.postings[term]
+            documents.pop(key, None)
+            if not documents:
+                del self.postings[term]
+                self._vocabulary = None
+        self.total_length -= self.lengths.pop(key, 0.0)
+
+    def _expand(self, prefix):
+        if prefix in self.postings:
+            yield prefix
+            return
+        if len(prefix) < MIN_PREFIX:
+            return
+        if self._vocabulary is None:
+            self._vocabulary = sorted(self.postings)
+        position = bisect_left(self._vocabulary, prefix)
+        while position < len(self._vocabulary) and self._vocabulary[position].startswith(prefix):
+            yield self._vocabulary[position]
+            position += 1
+
+    def search(self, query, kinds=None, limit=20, rank_limit=RANK_LIMIT):
+        """Same results and ``rank_limit`` behaviour as ``fts_search``."""
+        kinds = set(kinds or KINDS)
+        count = len(self.lengths)
+        terms = [list(self._expand(prefix)) for prefix in set(tokenize(query))]
+        if not count or not terms or not all(terms):
+            return []
+        # Every query term has to match one of its expansions.
+        candidates = None
+        for expansions in terms:
+            matching = {key for term in expansions for key in self.postings[term] if key[0] in kinds}
+            candidates = matching if candidates is None else candidates & matching
+        if len(candidates) > rank_limit:
+            return [(kind, ref, 0.0) for kind, ref in heapq.nlargest(limit, candidates, key=lambda key: key[1])]
+        average_length = self.total_length / count
+        scores = Counter()
+        for expansions in terms:
+            for term in expansions:
+                documents = self.postings[term]
+                idf = math.log(1 + (count - len(documents) + 0.5) / (len(documents) + 0.5))
+                for key in candidates.intersection(documents):
+                    frequency = documents[key]
+                    norm = self.k1 * (1 - self.b + self.b * self.lengths[key] / average_length)
+                    scores[key] += idf * frequency * (self.k1 + 1) / (frequency + norm)
+        return [(kind, ref, score) for (kind, ref), score in scores.most_common(limit)]
+
+
+def init_app(app):
+    app.extensions['search'] = {'backend': None, 'index': InvertedIndex(), 'built': False}
+
+
+def _state():
+    return current_app.extensions['search']
+
+
+def backend(connection=None):
+    state = _state()
+    if state['backend'] is None:
+        configured = current_app.config.get('SEARCH_BACKEND', 'auto')
+        if configured == 'auto':
+            configured = 'fts5' if fts_available(connection or db.session.connection()) else 'memory'
+        state['backend'] = configured
+    return state['backend']
+
+
+def iter_documents(batch_size=1000):
+    """Yield ``(kind, ref, title, body)`` for every searchable row, reading in batches."""
+    for kind, (model, title_field, body_fields) in SOURCES.items():
+        columns = [model.id] + [getattr(model, field) for field in (title_field,) + body_fields]
+        result = db.session.execute(select(*columns).execution_options(yield_per=batch_size))
+        for row in result:
+            yield (kind, row.id) + document(kind, row)
+
+
+def _build_memory_index(state):
+    index = InvertedIndex()
+    for kind, ref, title, body in iter_documents():
+        index.add(kind, ref, title, body)
+    state['index'] = index
+    state['built'] = True
+    return index
+
+
+def rebuild(batch_size=1000):
+    """Repopulate the index of the current backend; returns the number of documents.
+
+    With ``SEARCH_BACKEND = 'auto'`` on SQLite this also creates the FTS5
+    table, switching the search over to it.
+    """
+    state = _state()
+    connection = db.session.connection()
+    if current_app.config.get('SEARCH_BACKEND', 'auto') == 'auto' and connection.dialect.name == 'sqlite':
+        create_fts_table(connection)
+        state['backend'] = None
+    if backend(connection) == 'memory':
+        with state['index'].lock:
+            return len(_build_memory_index(state))
+    connection.execute(text(f'DELETE FROM {FTS_TABLE}'))
+    total = 0
+    batch = []
+    for entry in iter_documents(batch_size):
+        batch.append(entry)
+        if len(batch) >= batch_size:
+            fts_write(connection, batch, replace=False)
+            total += len(batch)
+            batch = []
+    fts_write(connection, batch, replace=False)
+    db.session.commit()
+    return total + len(batch)
+
+
+def load_results(matches, visible=None):
+    """Turn ``search`` matches into result dicts, keeping their order.
+
+    ``visible`` maps a kind to an extra criterion its rows must meet; the
+    matches that fail it are left out.
+    """
+    refs = defaultdict(list)
+    for kind, ref, _ in matches:
+        refs[kind].append(ref)
+    rows = {}
+    for kind, ids in refs.items():
+        model = SOURCES[kind][0]
+        query = model.query.filter(model.id.in_(ids))
+        if visible and kind in visible:
+            query = query.filter(visible[kind])
+        rows.update(((kind, row.id), row) for row in query)
+    results = []
+    for kind, ref, score in matches:
+        row = rows.get((kind, ref))
+        if row is not None:
+            title, body = document(kind, row)
+            results.append({'kind': kind, 'id': ref, 'title': title, 'body': body, 'score': score,
+                            'client_id': row.id if kind == 'client' else row.client_id})
+    return results
+
+
+def search(query, kinds=None, limit=20):
+    """``[(kind, ref, score)]`` for ``query``, best match first."""
+    if backend() == 'fts5':
+        return fts_search(db.session.connection(), query, kinds, limit)
+    state = _state()
+    with state['index'].lock:
+        index = state['index'] if state['built'] else _build_memory_index(state)
+        return index.search(query, kinds, limit)
+
+
+def _indexed_fields_changed(kind, target):
+    _, title_field, body_fields = SOURCES[kind]
+    attributes = inspect(target).attrs
+    return any(attributes[field].history.has_changes() for field in (title_field,) + body_fields)
+
+
+def _changed(connection, target, deleted=False):
+    if not has_app_context() or 'search' not in current_app.extensions:
+        return
+    kind = _MODEL_KINDS[type(target)]
+    title, body = (None, None) if deleted else document(kind, target)
+    if backend(connection) == 'fts5':
+        fts_write(connection, [(kind, target.id, title, body)])
+    else:
+        object_session(target).info.setdefault(_PENDING_KEY, []).append((kind, target.id, title, body))
+
+
+def _after_insert(mapper, connection, target):
+    _changed(connection, target)
+
+
+def _after_update(mapper, connection, target):
+    if _indexed_fields_changed(_MODEL_KINDS[type(target)], target):
+        _changed(connection, target)
+
+
+def _after_delete(mapper, connection, target):
+    _changed(connection, target, deleted=True)
+
+
+for _model in _MODEL_KINDS:
+    event.listen(_model, 'after_insert', _after_insert)
+    event.listen(_model, 'after_update', _after_update)
+    event.listen(_model, 'after_delete', _after_delete)
+
+
+@event.listens_for(db.session, 'after_commit')
+def _apply_pending(session):
+    pending = session.info.pop(_PENDING_KEY, ())
+    if not pending:
+        return
+    state = _state()
+    with state['index'].lock:
+        # An index that has not been built yet will read these rows from the database.
+        if state['built']:
+            for kind, ref, title, body in pending:
+                if title is None:
+                    state['index'].remove(kind, ref)
+                else:
+                    state['index'].add(kind, ref, title, body)
+
+
+@event.listens_for(db.session, 'after_soft_rollback')
+def _discard_pending(session, previous_transaction):
+    session.info.pop(_PENDING_KEY, None)
@@ -0,0 +1,60 @@
+"""Mergeable quantile sketch for durations.
+
+A ``LogHistogram`` counts values in logarithmic buckets, each ``GAMMA``
+times wider than the one before, so any quantile it returns is within
+``RELATIVE_ACCURACY`` of the true value whatever the spread of the data.
+Bucket counts simply add up, which lets the reports keep one row per
+bucket in the database, increment it as tasks complete and merge weeks,
+workers or clients with a ``SUM``.
+"""
+import math
+
+RELATIVE_ACCURACY = 0.01
+GAMMA = (1 + RELATIVE_ACCURACY) / (1 - RELATIVE_ACCURACY)
+_LOG_GAMMA = math.log(GAMMA)
+
+# Values below this (durations under a second) all share bucket 0.
+MIN_VALUE = 1.0
+
+
+def bucket(value):
+    return max(math.ceil(math.log(max(value, MIN_VALUE)) / _LOG_GAMMA), 0)
+
+
+def bucket_value(index):
+    # The point of the bucket closest in relative terms to everything in it.
+    if index <= 0:
+        return 0.0
+    return 2 * GAMMA ** index / (GAMMA + 1)
+
+
+class LogHistogram:
+    def __init__(self, counts=None):
+        self.counts = dict(counts or {})
+
+    def __len__(self):
+        return sum(self.counts.values())
+
+    def add(self, value, count=1):
+        index = bucket(value)
+        self.counts[index] = self.counts.get(index, 0) + count
+        if not self.counts[index]:
+            del self.counts[index]
+
+    def merge(self, other):
+        for index, count in other.counts.items():
+            self.counts[index] = self.counts.get(index, 0) + count
+        return self
+
+    def quantile(self, q):
+        """The ``q`` quantile (0 to 1), or ``None`` when the histogram is empty."""
+        total = len(self)
+        if total <= 0:
+            return None
+        rank = q * (total - 1)
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen > rank:
+                return bucket_value(index)
+        return bucket_value(max(self.counts))
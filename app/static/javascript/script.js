@@ -1,10 +1,49 @@
+    function setNotificationCount(data) {
+        const badge = document.getElementById('notification-badge');
+        if (!badge) {
+            return;
+        }
+        if (data.count !== undefined) {
+            badge.innerText = data.count;
+        } else {
+            badge.innerText = Math.max(0, parseInt(badge.innerText || '0', 10) + data.delta);
+        }
+    }
+
     function updateNotificationCount() {
-        fetch('{{ url_for("main.get_unread_notification_count") }}')
+        const badge = document.getElementById('notification-badge');
+        if (!badge) {
+            return;
+        }
+        fetch(badge.dataset.countUrl)
             .then(response => response.json())
-            .then(data => {
-                document.querySelector('.badge-danger').innerText = data.count;
-            });
+            .then(setNotificationCount);
+    }
+
+    // Push channel: the server sends unread counts and task moves as they happen.
+    // Pages listen for the 'smma:task' DOM event to apply task moves.
+    function openStream() {
+        const badge = document.getElementById('notification-badge');
+        if (!badge || !window.EventSource) {
+            return null;
+        }
+        const source = new EventSource(badge.dataset.streamUrl);
+        source.addEventListener('unread', event => setNotificationCount(JSON.parse(event.data)));
+        source.addEventListener('task', event => {
+            document.dispatchEvent(new CustomEvent('smma:task', { detail: JSON.parse(event.data) }));
+        });
+        source.addEventListener('resync', () => location.reload());
+        return source;
     }
 
-    // Update every 30 seconds (adjust as needed)
-    setInterval(updateNotificationCount, 30000);
+    // Polling stays on as a safety net: every 30 seconds while the stream is missing, closed
+    // (e.g. the server is out of stream slots) or reconnecting, and every 2 minutes while it is
+    // open, in case a message was published where this stream didn't hear it.
+    const source = openStream();
+    let pollTicks = 0;
+    setInterval(() => {
+        pollTicks += 1;
+        if (!source || source.readyState !== EventSource.OPEN || pollTicks % 4 === 0) {
+            updateNotificationCount();
+        }
+    }, 30000);
@@ -0,0 +1,111 @@
+"""Task lifecycle helpers shared by every view that creates or moves a task.
+
+Every creation and status change is also published on the ``/stream``
+channel to the task's worker and to the managers once it commits.
+"""
+from datetime import datetime, timezone
+from sqlalchemy import event
+from app import counters, db, deadlines, events, reports
+from app.models import Task
+
+_EVENTS_KEY = 'task_events'
+
+TASK_STATUSES = ('Assigned', 'In Progress', 'Completed')
+
+
+def create_task(**fields):
+    task = Task(status='Assigned', **fields)
+    db.session.add(task)
+    counters.record_task_status(task.worker_id, None, task.status)
+    deadlines.record_status(task, None, task.status)
+    _queue_event(task, None)
+    return task
+
+
+def change_status(task, new_status):
+    """Move ``task`` to ``new_status``, stamping its timestamps, counters and report rollups.
+
+    Nothing is committed; callers commit once with the rest of their changes.
+    """
+    old_status = task.status
+    if old_status == 'Completed':
+        reports.record_completion(task, -1)
+    task.status = new_status
+    if new_status == 'In Progress':
+        task.in_progress_time = datetime.now(timezone.utc)
+    elif new_status == 'Completed':
+        task.completion_time = datetime.now(timezone.utc)
+        reports.record_completion(task)
+    counters.record_task_status(task.worker_id, old_status, new_status)
+    deadlines.record_status(task, old_status, new_status)
+    if old_status != new_status:
+        _queue_event(task, old_status)
+
+
+def task_card(task):
+    return {
+        'id': task.id,
+        'status': task.status,
+        'task_description': task.task_description,
+        'worker_name': task.assigned_worker.name if task.assigned_worker else None,
+        'version': task.version,
+    }
+
+
+def move_tasks(query, moves):
+    """Apply ``[{task_id, status, expected_version}]`` to the tasks ``query`` returns.
+
+    Each move only happens if the task is still at ``expected_version``;
+    the others are reported rather than applied. Returns one result per
+    move, in order, and the tasks that moved. Flushes but
+    doesn't commit, so a concurrent write still surfaces as StaleDataError.
+    """
+    ids = {move.get('task_id') for move in moves if isinstance(move, dict) and isinstance(move.get('task_id'), int)}
+    tasks = {task.id: task for task in query.filter(Task.id.in_(ids))} if ids else {}
+    results, moved, seen = [], [], set()
+    for move in moves:
+        task_id = move.get('task_id') if isinstance(move, dict) else None
+        if not isinstance(task_id, int) or move.get('status') not in TASK_STATUSES or not isinstance(move.get('expected_version'), int):
+            results.append({'task_id': task_id, 'result': 'invalid'})
+            continue
+        if task_id in seen:
+            results.append({'task_id': task_id, 'result': 'duplicate'})
+            continue
+        seen.add(task_id)
+        task = tasks.get(task_id)
+        if task is None:
+            results.append({'task_id': task_id, 'result': 'not_found'})
+        elif task.version != move['expected_version']:
+            results.append({'task_id': task_id, 'result': 'conflict', 'task': task})
+        elif task.status == move['status']:
+            results.append({'task_id': task_id, 'result': 'unchanged', 'task': task})
+        else:
+            moved.append(task)
+            change_status(task, move['status'])
+            results.append({'task_id': task_id, 'result': 'moved', 'task': task})
+    db.session.flush()
+    for result in results:
+        if 'task' in result:
+            result['task'] = task_card(result['task'])
+    return results, moved
+
+
+def _queue_event(task, old_status):
+    db.session.info.setdefault(_EVENTS_KEY, []).append((task, old_status))
+
+
+@event.listens_for(db.session, 'before_commit')
+def _collect_events(session):
+    # New tasks only get an id when flushed and everything is expired after the
+    # commit, so the payloads are built in between.
+    pending = session.info.pop(_EVENTS_KEY, ())
+    if pending:
+        session.flush()
+    for task, old_status in pending:
+        events.publish_after_commit('task', dict(task_card(task), old_status=old_status),
+                                    user_ids=[task.worker_id], managers=True, session=session)
+
+
+@event.listens_for(db.session, 'after_soft_rollback')
+def _discard_events(session, previous_transaction):
+    session.info.pop(_EVENTS_KEY, None)
@@ -0,0 +1,92 @@
+"""Cached user lookups.
+
+Every authenticated request loads its user, most writes notify the
+managers and many pages show a worker's name, so users are served from a
+bounded ``TTLCache`` of column snapshots instead of a SELECT each time.
+``get_user`` turns a snapshot back into a ``User`` attached to the current
+session without querying (the password hash is left out and loads on
+first access). Being in the session's identity map, it also satisfies
+lazy ``task.assigned_worker``/``task.manager`` loads for the rest of the
+request. The set of manager ids is cached the same way.
+
+Any insert, update or delete of a user (registration, a role change)
+drops that user and the manager ids once the transaction commits. Each
+process has its own cache, so another process sees such a change after at
+most ``USER_CACHE_TTL`` seconds.
+"""
+from flask import current_app, has_app_context
+from sqlalchemy import event, select
+from sqlalchemy.orm import make_transient_to_detached, object_session
+from app import db
+from app.cache import TTLCache
+from app.models import User
+
+_CHANGED_KEY = 'changed_users'
+_COLUMNS = ('id', 'email', 'name', 'is_manager')
+
+
+def init_app(app):
+    app.extensions['users'] = TTLCache(maxsize=app.config.get('USER_CACHE_SIZE', 10000),
+                                       ttl=app.config.get('USER_CACHE_TTL', 300))
+    app.extensions['manager_ids'] = TTLCache(maxsize=1, ttl=app.config.get('MANAGER_IDS_CACHE_TTL', 60))
+
+
+def get_user(user_id):
+    """The ``User`` with ``user_id`` in the current session, or None."""
+    session = db.session()
+    user = session.identity_map.get(session.identity_key(User, user_id))
+    if user is not None:
+        return user
+    cache = current_app.extensions['users']
+    snapshot = cache.get(user_id)
+    if snapshot is None:
+        user = session.get(User, user_id)
+        if user is not None:
+            cache.set(user_id, {column: getattr(user, column) for column in _COLUMNS})
+        return user
+    user = User(**snapshot)
+    make_transient_to_detached(user)
+    session.add(user)
+    return user
+
+
+def load_user(user_id):
+    return get_user(int(user_id))
+
+
+def manager_ids():
+    cache = current_app.extensions['manager_ids']
+    ids = cache.get('ids')
+    if ids is None:
+        ids = frozenset(db.session.scalars(select(User.id).where(User.is_manager == True)))
+        cache.set('ids', ids)
+    return ids
+
+
+def invalidate(user_id=None):
+    """Drop ``user_id`` (or every user) and the manager ids from the caches."""
+    if user_id is None:
+        current_app.extensions['users'].clear()
+    else:
+        current_app.extensions['users'].delete(user_id)
+    current_app.extensions['manager_ids'].clear()
+
+
+@event.listens_for(User, 'after_insert')
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def _user_changed(mapper, connection, user):
+    object_session(user).info.setdefault(_CHANGED_KEY, set()).add(user.id)
+
+
+@event.listens_for(db.session, 'after_commit')
+def _invalidate_changed(session):
+    changed = session.info.pop(_CHANGED_KEY, None)
+    if changed and has_app_context():
+        for user_id in changed:
+            invalidate(user_id)
+
+
+@event.listens_for(db.session, 'after_soft_rollback')
+def _discard_changed(session, previous_transaction):
+    session.info.pop(_CHANGED_KEY, None)
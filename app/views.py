@@ -1,20 +1,21 @@
-from flask import Blueprint, render_template, redirect, url_for, request, flash, send_file, jsonify
-from flask_login import login_user, logout_user, login_required, current_user
+from flask import Blueprint, render_template, redirect, url_for, request, flash, jsonify, current_app, abort, Response
+from flask_login import login_required, current_user
+from sqlalchemy.orm import joinedload
+from sqlalchemy.orm.exc import StaleDataError
 from app import db
-import io, csv
-from datetime import datetime
-from app.models import User, Client, Task, OnboardingTask, ContentIdea, Metric, Notification
-from app.forms import ClientForm, OnboardingTaskForm, ContentIdeaForm, MetricForm, TaskForm, TaskSubmissionForm, LoginForm, RegisterForm
+from datetime import date
+from app.models import Client, Task, OnboardingTask, ContentIdea, Metric, Notification
+from app.forms import ClientForm, OnboardingTaskForm, ContentIdeaForm, MetricForm, MetricImportForm, TaskForm, TaskSubmissionForm
+from app.pagination import Listing, equals, keyset_page, on_or_after, on_or_before
+from app import choices, counters, events, exports, metrics_io, notifications as notification_service, reports, search as search_service, users
+from app.tasks import TASK_STATUSES, change_status, create_task, move_tasks, task_card
 
 main = Blueprint('main', __name__)
 
-def get_unread_notification_count(user_id):
-    return Notification.query.filter_by(user_id=user_id, read=False).count()
-
 @main.context_processor
 def inject_notification_count():
     if current_user.is_authenticated:
-        unread_notification_count = get_unread_notification_count(current_user.id)
+        unread_notification_count = notification_service.unread_count(current_user.id)
         return {'unread_notification_count': unread_notification_count}
     return {'unread_notification_count': 0}
 
@@ -32,16 +33,15 @@ def manager_dashboard():
     if not current_user.is_manager:
         return redirect(url_for('main.index'))
     
-    active_clients_count = Client.query.filter_by(status='Active').count()
-    completed_tasks_count = Task.query.filter_by(status='Completed').count()
-    assigned_tasks_count = Task.query.filter_by(status='Assigned').count()
-    in_progress_tasks_count = Task.query.filter_by(status='In Progress').count()
+    totals = counters.get_counters()
 
     return render_template('manager_dashboard.html', 
-                           active_clients_count=active_clients_count,
-                           completed_tasks_count=completed_tasks_count,
-                           assigned_tasks_count=assigned_tasks_count,
-                           in_progress_tasks_count=in_progress_tasks_count)
+                           active_clients_count=totals.active_clients,
+                           completed_tasks_count=totals.completed,
+                           assigned_tasks_count=totals.assigned,
+                           pending_tasks_count=totals.assigned,
+                           in_progress_tasks_count=totals.in_progress,
+                           overdue_tasks_count=totals.overdue)
 
 
 
@@ -49,96 +49,237 @@ def manager_dashboard():
 @main.route('/worker_dashboard')
 @login_required
 def worker_dashboard():
-    pending_tasks_count = Task.query.filter_by(worker_id=current_user.id, status='Assigned').count()
-    in_progress_tasks_count = Task.query.filter_by(worker_id=current_user.id, status='In Progress').count()
-    completed_tasks_count = Task.query.filter_by(worker_id=current_user.id, status='Completed').count()
-    average_completion_time = db.session.query(db.func.avg(Task.completion_time)).filter_by(worker_id=current_user.id).scalar()
-    return render_template('worker_dashboard.html', pending_tasks_count=pending_tasks_count, in_progress_tasks_count=in_progress_tasks_count, completed_tasks_count=completed_tasks_count, average_completion_time=average_completion_time) 
+    own = counters.get_counters(current_user.id)
+    stats = reports.worker_stats(current_user.id)
+    return render_template('worker_dashboard.html', pending_tasks_count=own.assigned, in_progress_tasks_count=own.in_progress, completed_tasks_count=own.completed, overdue_tasks_count=own.overdue, stats=stats)
+
+NOTIFICATION_LISTING = Listing(Notification, sorts={'timestamp': Notification.timestamp}, filters={
+    'type': equals(Notification.type),
+}, default_sort='timestamp')
 
 @main.route('/notifications')
 @login_required
 def notifications():
-    notifications = Notification.query.filter_by(user_id=current_user.id, read=False).order_by(Notification.timestamp.desc()).all()
-    return render_template('notifications.html', notifications=notifications)
+    # Unread only unless ?show=all; both are served by the (user_id, read, timestamp) index.
+    show_all = request.args.get('show') == 'all'
+    query = Notification.query.filter_by(user_id=current_user.id)
+    if not show_all:
+        query = query.filter_by(read=False)
+    return list_response(NOTIFICATION_LISTING, query, ('message', 'type', 'timestamp', 'read'), 'notifications.html',
+                         types=notification_service.unread_types(current_user.id), show_all=show_all)
+
+@main.route('/notifications/mark_read', methods=['POST'])
+@login_required
+def mark_notifications_read():
+    """Mark all, one type or a list of ids as read in one statement.
+
+    Takes JSON ``{"all": true}``, ``{"type": ...}`` and/or ``{"ids": [...]}``,
+    or the same as form fields from the inbox, which is redirected back to.
+    """
+    if request.is_json:
+        data = request.get_json(silent=True) or {}
+        everything, type, ids = data.get('all') is True, data.get('type'), data.get('ids')
+    else:
+        everything, type = request.form.get('all') == '1', request.form.get('type') or None
+        # "Mark selected" with nothing ticked just marks nothing.
+        ids = request.form.getlist('ids', type=int) or (None if everything or type else [])
+    if ids is not None and (not isinstance(ids, list) or not all(isinstance(id, int) for id in ids)
+                            or len(ids) > current_app.config['NOTIFICATION_MARK_MAX_IDS']):
+        return jsonify({'message': f'ids must be a list of at most {current_app.config["NOTIFICATION_MARK_MAX_IDS"]} ids'}), 400
+    if not everything and type is None and ids is None:
+        return jsonify({'message': 'Give "all", "type" or "ids"'}), 400
+    marked = notification_service.mark_read(current_user.id, ids, type)
+    db.session.commit()
+    if request.is_json:
+        return jsonify({'marked': marked, 'unread': notification_service.unread_count(current_user.id)})
+    return redirect(url_for('main.notifications', **request.args))
 
 @main.route('/mark_notification_as_read/<int:notification_id>')
 @login_required
 def mark_notification_as_read(notification_id):
-    notification = Notification.query.get_or_404(notification_id)
-    notification.read = True
+    notification_service.mark_read(current_user.id, [notification_id])
     db.session.commit()
-    return redirect(url_for('main.notifications'))
+    return redirect(url_for('main.notifications', **request.args))
+
+@main.route('/notifications/unread_count')
+@login_required
+def get_unread_notification_count():
+    return jsonify({'count': notification_service.unread_count(current_user.id)})
+
+@main.route('/stream')
+@login_required
+def stream():
+    # Not wrapped in stream_with_context: the connection stays open for a long time
+    # and must not hold on to the request's database session.
+    # Counted before subscribing, so that a failing query can't leave the slot taken.
+    initial_count = notification_service.unread_count(current_user.id)
+    heartbeat = current_app.config['STREAM_HEARTBEAT_SECONDS']
+    broker = events.broker()
+    subscription = broker.subscribe(current_user.id, current_user.is_manager)
+    if subscription is None:
+        # Every stream slot of this process is taken; the page polls the unread count instead.
+        return Response('Too many open streams', status=503, headers={'Retry-After': '60'})
+
+    def generate():
+        yield events.format_sse('unread', {'count': initial_count})
+        while True:
+            message = subscription.get(timeout=heartbeat)
+            yield message if message is not None else ': keepalive\n\n'
+
+    response = Response(generate(), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    # Runs when the server closes the response, even if the client left before the first message.
+    response.call_on_close(lambda: broker.unsubscribe(subscription))
+    return response
+
+TASK_LISTING = Listing(Task, sorts={'created_at': Task.created_at, 'deadline': Task.deadline}, filters={
+    'status': equals(Task.status),
+    'worker': equals(Task.worker_id, int),
+    'client': equals(Task.client_id, int),
+    'deadline_from': on_or_after(Task.deadline),
+    'deadline_to': on_or_before(Task.deadline),
+})
+
+CLIENT_LISTING = Listing(Client, sorts={'created_at': Client.created_at}, filters={
+    'status': equals(Client.status),
+})
+
+def list_response(listing, query, fields, template, **context):
+    """Render one page of ``listing`` as HTML, or as JSON when ``?format=json`` is given."""
+    limit = min(request.args.get('limit', current_app.config['LIST_PAGE_SIZE'], type=int), current_app.config['LIST_MAX_PAGE_SIZE'])
+    page = listing.page(query, request.args, max(limit, 1))
+    if request.args.get('format') == 'json':
+        items = [dict({'id': row.id}, **{field: _section_value(row, field) for field in fields}) for row in page.rows]
+        return jsonify({'items': items, 'next_cursor': page.next_cursor, 'sort': page.sort, 'order': page.order})
+    return render_template(template, page=page, listing=listing, **context)
 
 @main.route('/clients')
 @login_required
 def clients():
-    if current_user.is_manager:
-        clients = Client.query.all()
-    else:
-        clients = Client.query.filter_by(user_id=current_user.id).all()
-    return render_template('clients.html', clients=clients)
+    query = Client.query
+    if not current_user.is_manager:
+        query = query.filter_by(user_id=current_user.id)
+    return list_response(CLIENT_LISTING, query, ('name', 'contact_number', 'business_category', 'social_media_handles', 'status'),
+                         'clients.html')
 
 @main.route('/client/<int:client_id>')
 @login_required
 def client_profile(client_id):
+    # Only the header is rendered here; each section pages itself in from client_section_feed.
     client = Client.query.get_or_404(client_id)
-    tasks = Task.query.filter_by(client_id=client_id).all()
-    onboarding_tasks = OnboardingTask.query.filter_by(client_id=client_id).all()
-    content_ideas = ContentIdea.query.filter_by(client_id=client_id).all()
-    metrics = Metric.query.filter_by(client_id=client_id).all()
-    return render_template('client_profile.html', client=client, tasks=tasks, onboarding_tasks=onboarding_tasks, content_ideas=content_ideas, metrics=metrics)
+    return render_template('client_profile.html', client=client, sections=CLIENT_SECTIONS)
+
+# Fields each client profile section sends to the page, in column order.
+CLIENT_SECTIONS = {
+    'onboarding_tasks': (OnboardingTask, ('task_name', 'responsible', 'deadline')),
+    'content_ideas': (ContentIdea, ('idea_source', 'description', 'link', 'sound', 'status')),
+    'metrics': (Metric, ('platform', 'post_date', 'views', 'likes', 'comments', 'shares')),
+    'tasks': (Task, ('task_description', 'worker_name', 'deadline', 'status', 'completion_description', 'completion_link')),
+}
+
+def _section_value(row, field):
+    if field == 'worker_name':
+        return row.assigned_worker.name if row.assigned_worker else None
+    value = getattr(row, field)
+    return value if value is None or isinstance(value, (int, str)) else str(value)
+
+def client_section(client_id, section, cursor=None, limit=None):
+    model, fields = CLIENT_SECTIONS[section]
+    query = model.query.filter(model.client_id == client_id)
+    if model is Task:
+        query = query.options(joinedload(Task.assigned_worker))
+    rows, next_cursor = keyset_page(query, model.id, cursor=cursor, limit=limit or current_app.config['CLIENT_SECTION_PAGE_SIZE'])
+    items = [dict({'id': row.id}, **{field: _section_value(row, field) for field in fields}) for row in rows]
+    return items, next_cursor
+
+@main.route('/client/<int:client_id>/sections/<section>.json')
+@login_required
+def client_section_feed(client_id, section):
+    if section not in CLIENT_SECTIONS:
+        abort(404)
+    limit = min(request.args.get('limit', current_app.config['CLIENT_SECTION_PAGE_SIZE'], type=int), current_app.config['CLIENT_SECTION_MAX_PAGE_SIZE'])
+    items, next_cursor = client_section(client_id, section, cursor=request.args.get('cursor', type=int), limit=max(limit, 1))
+    return jsonify({'items': items, 'next_cursor': next_cursor})
+
+def _analytics_args():
+    start = request.args.get('start', type=date.fromisoformat)
+    end = request.args.get('end', type=date.fromisoformat)
+    top = min(request.args.get('top', 10, type=int), 100)
+    return start, end, max(top, 1)
+
+@main.route('/client/<int:client_id>/analytics.json')
+@login_required
+def client_analytics(client_id):
+    from app import analytics  # numpy is only imported once analytics are asked for
+    start, end, top = _analytics_args()
+    return jsonify(analytics.client_analytics(client_id, start, end, top))
 
+@main.route('/analytics.json')
+@login_required
+def all_clients_analytics():
+    if not current_user.is_manager:
+        abort(403)
+    from app import analytics
+    start, end, top = _analytics_args()
+    return jsonify(analytics.client_analytics(None, start, end, top))
+
+
+@main.route('/search')
+@login_required
+def search():
+    query = request.args.get('q', '').strip()
+    kinds = [kind for kind in request.args.getlist('kind') if kind in search_service.SOURCES]
+    limit = max(min(request.args.get('limit', current_app.config['SEARCH_PAGE_SIZE'], type=int), current_app.config['SEARCH_MAX_PAGE_SIZE']), 1)
+    visible = None
+    if not current_user.is_manager:
+        visible = {'client': Client.user_id == current_user.id, 'task': Task.worker_id == current_user.id}
+    # Workers cannot see every match, so ask for more to still fill the page.
+    matches = search_service.search(query, kinds, limit if visible is None else limit * 3) if query else []
+    results = search_service.load_results(matches, visible)[:limit]
+    if request.args.get('format') == 'json':
+        return jsonify({'query': query, 'results': results})
+    return render_template('search.html', query=query, kinds=kinds, results=results)
 
 @main.route('/assign_task', methods=['GET', 'POST'])
 @login_required
 def assign_task():
     form = TaskForm()
-    
-    # Populate worker email dropdown with non-manager users
-    form.worker_email.choices = [(user.email, user.email) for user in User.query.filter_by(is_manager=False).all()]
-    
-    # Populate client dropdown with clients
-    form.client_id.choices = [(client.id, client.name) for client in Client.query.all()]
+    if request.method == 'GET':
+        form.client_id.data = request.args.get('client_id', type=int)
 
     if form.validate_on_submit():
-        worker = User.query.filter_by(email=form.worker_email.data).first()
+        worker = users.get_user(form.worker_id.data)
         if worker:
-            new_task = Task(
+            new_task = create_task(
                 manager_id=current_user.id,
                 worker_id=worker.id,
                 client_id=form.client_id.data,
                 task_description=form.task_description.data,
-                deadline=form.deadline.data,
-                status='Assigned'
-            )
-            db.session.add(new_task)
-            db.session.commit()
-            
-            # Create notification for the worker
-            notification = Notification(
-                user_id=worker.id,
-                message=f'You have been assigned a new task: {new_task.task_description}',
-                type='task_assigned'
+                deadline=form.deadline.data
             )
-            db.session.add(notification)
             
-            # Create notification for managers
-            managers = User.query.filter_by(is_manager=True).all()
-            for manager in managers:
-                notification = Notification(
-                    user_id=manager.id,
-                    message=f'A new task has been assigned to {worker.name}',
-                    type='task_assigned'
-                )
-                db.session.add(notification)
-                
+            # Notify the worker and the managers in the same transaction as the task
+            notification_service.notify([worker.id], f'You have been assigned a new task: {new_task.task_description}', 'task_assigned')
+            notification_service.notify_managers(f'A new task has been assigned to {worker.name}', 'task_assigned')
             db.session.commit()
             
             flash('Task assigned successfully!', 'success')
             return redirect(url_for('main.kanban_board'))
         else:
             flash('Worker not found.', 'danger')
-    return render_template('assign_task.html', form=form)
+    return render_template('assign_task.html', form=form,
+                           worker_label=choices.label('workers', form.worker_id.data) or '',
+                           client_label=choices.label('clients', form.client_id.data) or '')
+
+@main.route('/choices/<kind>')
+@login_required
+def choices_feed(kind):
+    """Typeahead matches for the assign task form: ``{"items": [{"id", "label"}]}``."""
+    if kind not in choices.SOURCES:
+        abort(404)
+    limit = min(request.args.get('limit', current_app.config['CHOICES_PAGE_SIZE'], type=int), current_app.config['CHOICES_MAX_PAGE_SIZE'])
+    matches = choices.search(kind, request.args.get('q', ''), max(limit, 1))
+    return jsonify({'items': [{'id': id, 'label': label} for id, label in matches]})
 
 
 
@@ -148,19 +289,12 @@ def submit_task(task_id):
     task = Task.query.get_or_404(task_id)
     form = TaskSubmissionForm()
     if form.validate_on_submit():
-        task.status = 'Completed'
+        change_status(task, 'Completed')
         task.completion_description = form.completion_description.data
         task.completion_link = form.completion_link.data
-        task.completion_time = datetime.now()
-        db.session.commit()
         
-        # Create notification for the manager
-        notification = Notification(
-            user_id=task.manager_id,
-            message=f'Task "{task.task_description}" has been completed by {task.worker.name}',
-            type='task_completed'
-        )
-        db.session.add(notification)
+        # Notify the manager in the same transaction as the status change
+        notification_service.notify([task.manager_id], f'Task "{task.task_description}" has been completed by {task.assigned_worker.name}', 'task_completed')
         db.session.commit()
         
         flash('Task submitted successfully!', 'success')
@@ -183,17 +317,8 @@ def add_client():
             specific_requests=form.specific_requests.data
         )
         db.session.add(new_client)
-        db.session.commit()
-        
-        # Create notification for managers
-        managers = User.query.filter_by(is_manager=True).all()
-        for manager in managers:
-            notification = Notification(
-                user_id=manager.id,
-                message=f'A new client "{new_client.name}" has been added by {current_user.name}',
-                type='client_added'
-            )
-            db.session.add(notification)
+        counters.record_client_status(None, new_client.status)
+        notification_service.notify_managers(f'A new client "{new_client.name}" has been added by {current_user.name}', 'client_added')
         db.session.commit()
         
         flash('Client added successfully!', 'success')
@@ -212,17 +337,7 @@ def add_onboarding_task(client_id):
             deadline=form.deadline.data
         )
         db.session.add(new_task)
-        db.session.commit()
-        
-        # Create notification for managers
-        managers = User.query.filter_by(is_manager=True).all()
-        for manager in managers:
-            notification = Notification(
-                user_id=manager.id,
-                message=f'A new onboarding task "{new_task.task_name}" has been added for client ID {client_id}',
-                type='onboarding_task_added'
-            )
-            db.session.add(notification)
+        notification_service.notify_managers(f'A new onboarding task "{new_task.task_name}" has been added for client ID {client_id}', 'onboarding_task_added')
         db.session.commit()
         
         flash('Onboarding task added successfully!', 'success')
@@ -243,17 +358,7 @@ def add_content_idea(client_id):
             status=form.status.data
         )
         db.session.add(new_idea)
-        db.session.commit()
-        
-        # Create notification for managers
-        managers = User.query.filter_by(is_manager=True).all()
-        for manager in managers:
-            notification = Notification(
-                user_id=manager.id,
-                message=f'A new content idea has been added for client ID {client_id}',
-                type='content_idea_added'
-            )
-            db.session.add(notification)
+        notification_service.notify_managers(f'A new content idea has been added for client ID {client_id}', 'content_idea_added')
         db.session.commit()
         
         flash('Content idea added successfully!', 'success')
@@ -269,33 +374,23 @@ def add_metric(client_id):
             client_id=client_id,
             platform=form.platform.data,
             post_date=form.post_date.data,
+            posted_on=metrics_io.parse_post_date(form.post_date.data),
             views=form.views.data,
             likes=form.likes.data,
             comments=form.comments.data,
             shares=form.shares.data
         )
         db.session.add(new_metric)
-        db.session.commit()
-        
-        # Create notification for managers
-        managers = User.query.filter_by(is_manager=True).all()
-        for manager in managers:
-            notification = Notification(
-                user_id=manager.id,
-                message=f'A new metric has been added for client ID {client_id}',
-                type='metric_added'
-            )
-            db.session.add(notification)
+        notification_service.notify_managers(f'A new metric has been added for client ID {client_id}', 'metric_added')
         db.session.commit()
         
         flash('Metric added successfully!', 'success')
         return redirect(url_for('main.client_profile', client_id=client_id))
-        return render_template('add_metric.html', form=form)
+    return render_template('add_metric.html', form=form)
     
 @main.route('/tasks', methods=['GET', 'POST'])
 @login_required
 def task_list():
-    tasks = Task.query.filter_by(worker_id=current_user.id).all() if not current_user.is_manager else Task.query.all()
     form = TaskSubmissionForm()
     selected_task = None
 
@@ -304,15 +399,13 @@ def task_list():
         if selected_task:
             selected_task.completion_description = form.completion_description.data
             selected_task.completion_link = form.completion_link.data
-            selected_task.status = 'Completed'
-            selected_task.completion_time = datetime.now()
+            change_status(selected_task, 'Completed')
             db.session.commit()
             flash('Task submitted successfully!', 'success')
             return redirect(url_for('main.task_list'))
 
-    return render_template('task_list.html', tasks=tasks, is_worker=not current_user.is_manager, form=form, selected_task=selected_task)
-
-from datetime import datetime, timezone
+    return list_response(TASK_LISTING, _visible_tasks(), ('task_description', 'worker_name', 'deadline', 'status'),
+                         'task_list.html', statuses=TASK_STATUSES, is_worker=not current_user.is_manager, form=form, selected_task=selected_task)
 
 
 @main.route('/update_task_status', methods=['POST'])
@@ -321,133 +414,168 @@ def update_task_status():
     data = request.get_json()
     task_id = data.get('task_id')
     new_status = data.get('status')
+    if new_status not in TASK_STATUSES:
+        return jsonify({'message': 'Unknown task status'}), 400
     task = Task.query.get(task_id)
     if task:
+        expected_version = data.get('expected_version')
+        if expected_version is not None and expected_version != task.version:
+            return jsonify({'message': 'Task was changed by someone else', 'task': task_card(task)}), 409
         if task.status != new_status:
-            task.status = new_status
-            if new_status == 'In Progress':
-                task.in_progress_time = datetime.now(timezone.utc)
-            elif new_status == 'Completed':
-                task.completion_time = datetime.now(timezone.utc)
-            db.session.commit()
-
-            # Create notification for the manager
-            worker_name = User.query.get(task.worker_id).name if task.worker_id else current_user.name
-            notification_message = f'Task "{task.task_description}" has been moved to {new_status} by {worker_name}'
-            notification = Notification(
-                user_id=task.manager_id,
-                message=notification_message,
-                type='task_status_changed'
-            )
-            db.session.add(notification)
-            db.session.commit()
-            return jsonify({'message': f'Task status updated to {new_status}'})
+            try:
+                change_status(task, new_status)
+
+                # Notify the manager in the same transaction as the status change
+                notification_service.notify([task.manager_id], _status_message(task), 'task_status_changed')
+                db.session.flush()
+                card = task_card(task)
+                db.session.commit()
+            except StaleDataError:
+                db.session.rollback()
+                return jsonify({'message': 'Task was changed by someone else'}), 409
+            return jsonify({'message': f'Task status updated to {new_status}', 'task': card})
         else:
             return jsonify({'message': 'Task status unchanged'}), 400
     else:
         return jsonify({'message': 'Task not found'}), 404
 
+@main.route('/tasks/status:batch', methods=['POST'])
+@login_required
+def update_task_statuses():
+    """Apply many Kanban moves in one transaction; see ``tasks.move_tasks`` for the per-move results."""
+    data = request.get_json(silent=True) or {}
+    moves = data.get('moves')
+    if not isinstance(moves, list) or not moves:
+        return jsonify({'message': 'Expected a non-empty list of moves'}), 400
+    if len(moves) > current_app.config['TASK_BATCH_MAX_MOVES']:
+        return jsonify({'message': f'At most {current_app.config["TASK_BATCH_MAX_MOVES"]} moves per request'}), 400
+    try:
+        results, moved = move_tasks(_visible_tasks(), moves)
+        notification_service.notify_many([([task.manager_id], _status_message(task), 'task_status_changed')
+                                          for task in moved])
+        db.session.commit()
+    except StaleDataError:
+        # A task moved between our read and our write; nothing in the batch is applied.
+        db.session.rollback()
+        return jsonify({'message': 'Tasks were changed by someone else, please retry'}), 409
+    return jsonify({'moved': len(moved), 'results': results})
+
+def _status_message(task):
+    worker_name = users.get_user(task.worker_id).name if task.worker_id else current_user.name
+    return f'Task "{task.task_description}" has been moved to {task.status} by {worker_name}'
+
 @main.route('/submitted_tasks_report')
 @login_required
 def submitted_tasks_report():
-    tasks = Task.query.all()
-    return render_template('submitted_tasks_report.html', tasks=tasks)
+    weeks = request.args.get('weeks', current_app.config['REPORT_WEEKS'], type=int)
+    summary = reports.report(weeks if weeks and weeks > 0 else None)
+    if request.args.get('format') == 'json':
+        return jsonify(summary)
+    return render_template('submitted_tasks_report.html', report=summary, weeks=weeks)
 
 
-    tasks = Task.query.filter(Task.status == 'Completed').all()
-    return render_template('submitted_tasks_report.html', tasks=tasks)
 
+def _visible_tasks():
+    # Workers only ever see their own tasks; a worker filter from them is simply redundant.
+    query = Task.query.options(joinedload(Task.assigned_worker))
+    if not current_user.is_manager:
+        query = query.filter(Task.worker_id == current_user.id)
+    return query
 
+def kanban_column(status, cursor=None, limit=None):
+    # One query per column; the worker is joined in so the cards never lazy-load it.
+    query = Task.query.options(joinedload(Task.assigned_worker)).filter(Task.status == status)
+    if not current_user.is_manager:
+        query = query.filter(Task.worker_id == current_user.id)
+    return keyset_page(query, Task.id, cursor=cursor, limit=limit or current_app.config['KANBAN_PAGE_SIZE'])
 
 @main.route('/kanban_board')
 @login_required
 def kanban_board():
-    if current_user.is_manager:
-        tasks = Task.query.all()
-    else:
-        tasks = Task.query.filter_by(worker_id=current_user.id).all()
-    return render_template('kanban_board.html', tasks=tasks)
+    columns = {status: kanban_column(status) for status in TASK_STATUSES}
+    return render_template('kanban_board.html', columns=columns)
+
+@main.route('/kanban_board/<status>.json')
+@login_required
+def kanban_column_feed(status):
+    if status not in TASK_STATUSES:
+        abort(404)
+    limit = min(request.args.get('limit', current_app.config['KANBAN_PAGE_SIZE'], type=int), current_app.config['KANBAN_MAX_PAGE_SIZE'])
+    tasks, next_cursor = kanban_column(status, cursor=request.args.get('cursor', type=int), limit=max(limit, 1))
+    return jsonify({'tasks': [task_card(task) for task in tasks], 'next_cursor': next_cursor})
 
 @main.route('/submitted_tasks')
 @login_required
 def submitted_tasks():
-    if current_user.is_manager:
-        tasks = Task.query.filter_by(status='Completed').all()
-    else:
-        tasks = Task.query.filter_by(worker_id=current_user.id, status='Completed').all()
-    return render_template('submitted_tasks.html', tasks=tasks)
+    return list_response(TASK_LISTING, _visible_tasks().filter(Task.status == 'Completed'),
+                         ('task_description', 'worker_name', 'deadline', 'status', 'completion_description', 'completion_link'),
+                         'submitted_tasks.html')
 
 @main.route('/forms')
 @login_required
 def forms():
     return render_template('forms.html')
 
-import io
-from flask import send_file
-import csv
-
 @main.route('/download_clients')
 @login_required
 def download_clients():
-    clients = Client.query.all()
-    output = io.BytesIO()
-    writer = csv.writer(io.TextIOWrapper(output, encoding='utf-8'))
-    writer.writerow(['ID', 'Name', 'Contact Number', 'Business Category', 'Social Media Handles', 'Goals', 'Specific Requests'])
-    for client in clients:
-        writer.writerow([client.id, client.name, client.contact_number, client.business_category, client.social_media_handles, client.goals, client.specific_requests])
-    output.seek(0)
-    return send_file(output, mimetype='text/csv', download_name='clients.csv', as_attachment=True)
+    return exports.export_response(exports.CLIENTS)
 
 @main.route('/download_tasks')
 @login_required
 def download_tasks():
-    tasks = Task.query.all()
-    output = io.BytesIO()
-    writer = csv.writer(io.TextIOWrapper(output, encoding='utf-8'))
-    writer.writerow(['ID', 'Manager ID', 'Worker ID', 'Client ID', 'Task Description', 'Deadline', 'Status', 'Completion Description', 'Completion Link'])
-    for task in tasks:
-        writer.writerow([task.id, task.manager_id, task.worker_id, task.client_id, task.task_description, task.deadline, task.status, task.completion_description, task.completion_link])
-    output.seek(0)
-    return send_file(output, mimetype='text/csv', download_name='tasks.csv', as_attachment=True)
+    return exports.export_response(exports.TASKS)
 
 @main.route('/download_onboarding_tasks/<int:client_id>')
 @login_required
 def download_onboarding_tasks(client_id):
-    onboarding_tasks = OnboardingTask.query.filter_by(client_id=client_id).all()
-    output = io.BytesIO()
-    writer = csv.writer(io.TextIOWrapper(output, encoding='utf-8'))
-    writer.writerow(['ID', 'Task Name', 'Responsible', 'Deadline'])
-    for task in onboarding_tasks:
-        writer.writerow([task.id, task.task_name, task.responsible, task.deadline])
-    output.seek(0)
-    return send_file(output, mimetype='text/csv', download_name='onboarding_tasks.csv', as_attachment=True)
+    return exports.export_response(exports.ONBOARDING_TASKS, OnboardingTask.client_id == client_id)
 
 @main.route('/download_content_ideas/<int:client_id>')
 @login_required
 def download_content_ideas(client_id):
-    content_ideas = ContentIdea.query.filter_by(client_id=client_id).all()
-    output = io.BytesIO()
-    writer = csv.writer(io.TextIOWrapper(output, encoding='utf-8'))
-    writer.writerow(['ID', 'Idea Source', 'Description', 'Link', 'Sound', 'Status'])
-    for idea in content_ideas:
-        writer.writerow([idea.id, idea.idea_source, idea.description, idea.link, idea.sound, idea.status])
-    output.seek(0)
-    return send_file(output, mimetype='text/csv', download_name='content_ideas.csv', as_attachment=True)
+    return exports.export_response(exports.CONTENT_IDEAS, ContentIdea.client_id == client_id)
+
+@main.route('/download_metrics')
+@login_required
+def download_all_metrics():
+    if not current_user.is_manager:
+        return redirect(url_for('main.index'))
+    client_ids = request.args.getlist('client_id', type=int)
+    if request.args.get('format') == 'parquet':
+        try:
+            body = metrics_io.export_parquet(db.engine, client_ids, current_app.config['METRICS_PARQUET_ROW_GROUP_SIZE'])
+        except metrics_io.MetricFileError as error:
+            abort(501, str(error))
+        return Response(body, mimetype='application/vnd.apache.parquet',
+                        headers={'Content-Disposition': 'attachment; filename=metrics.parquet'})
+    criteria = [Metric.client_id.in_(client_ids)] if client_ids else []
+    return exports.export_response(metrics_io.METRICS_ALL, *criteria)
+
+@main.route('/import_metrics', methods=['GET', 'POST'])
+@login_required
+def import_metrics():
+    if not current_user.is_manager:
+        return redirect(url_for('main.index'))
+    form = MetricImportForm()
+    result = None
+    if form.validate_on_submit():
+        upload = form.file.data
+        try:
+            rows = metrics_io.read_metrics(upload.stream, upload.filename)
+            imported, skipped, errors = metrics_io.import_metrics(rows, current_app.config['METRICS_IMPORT_BATCH_SIZE'])
+        except metrics_io.MetricFileError as error:
+            # Batches read before the error may already be in the session.
+            db.session.rollback()
+            form.file.errors.append(str(error))
+        else:
+            if imported:
+                notification_service.notify_managers(f'{imported} metrics have been imported by {current_user.name}', 'metrics_imported')
+            db.session.commit()
+            result = {'imported': imported, 'skipped': skipped, 'errors': errors}
+    return render_template('import_metrics.html', form=form, result=result)
 
 @main.route('/download_metrics/<int:client_id>')
 @login_required
 def download_metrics(client_id):
-    metrics = Metric.query.filter_by(client_id=client_id).all()
-    output = io.BytesIO()
-    writer = csv.writer(io.TextIOWrapper(output, encoding='utf-8'))
-    writer.writerow(['ID', 'Platform', 'Post Date', 'Views', 'Likes', 'Comments', 'Shares'])
-    for metric in metrics:
-        writer.writerow([metric.id, metric.platform, metric.post_date, metric.views, metric.likes, metric.comments, metric.shares])
-    output.seek(0)
-    return send_file(output, mimetype='text/csv', download_name='metrics.csv', as_attachment=True)
-
-
-
-
-
-
+    return exports.export_response(exports.METRICS, Metric.client_id == client_id)
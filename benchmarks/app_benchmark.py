@@ -0,0 +1,182 @@
+"""Time the busiest views through the Flask test client.
+
+    DATABASE_URI=sqlite:////tmp/agency.sqlite flask generate-data --scale 0.1
+    DATABASE_URI=sqlite:////tmp/agency.sqlite python benchmarks/app_benchmark.py --output before.json
+    DATABASE_URI=sqlite:////tmp/agency.sqlite python benchmarks/app_benchmark.py --compare before.json
+
+Every scenario is requested ``--requests`` times (``--download-requests``
+for the ``download_*`` exports, which stream whole tables) and its p50,
+p95 and p99 latency and queries per request are printed and, with
+``--output``, saved as JSON together with the commit and table sizes.
+``--compare`` prints the change against an earlier result file. Run it
+against data from ``flask generate-data``: ``update_task_status`` moves
+real tasks back and forth.
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from sqlalchemy import event, func, select  # noqa: E402
+from app import create_app, db  # noqa: E402
+from app.models import Client, ContentIdea, Metric, Notification, OnboardingTask, Task, User  # noqa: E402
+from app.sample_data import PASSWORD  # noqa: E402
+
+PERCENTILES = (50, 95, 99)
+
+app = create_app()
+
+
+def percentile(timings, p):
+    ordered = sorted(timings)
+    return ordered[min(len(ordered) - 1, max(0, round(p / 100 * len(ordered) + 0.5) - 1))]
+
+
+def login(email, password):
+    client = app.test_client()
+    response = client.post('/login', data={'email': email, 'password': password})
+    if response.status_code != 302:
+        raise SystemExit(f'could not log in as {email}')
+    return client
+
+
+def sample(args):
+    """Ids the scenarios pick from, so that requests do not all hit the same cached rows."""
+    generator = random.Random(args.seed)
+    with app.app_context():
+        worker_id = db.session.scalar(select(User.id).where(User.email == args.worker))
+        client_ids = db.session.scalars(select(Client.id).order_by(Client.id).limit(1000)).all()
+        open_tasks = dict(db.session.execute(select(Task.id, Task.status).where(
+            Task.worker_id == worker_id, Task.status.in_(('Assigned', 'In Progress'))).limit(1000)).all())
+        sizes = {model.__tablename__: db.session.scalar(select(func.count()).select_from(model))
+                 for model in (User, Client, Task, OnboardingTask, ContentIdea, Metric, Notification)}
+    if not client_ids or not open_tasks:
+        raise SystemExit('no clients or open tasks to benchmark; run flask generate-data first')
+    return generator, client_ids, open_tasks, sizes
+
+
+def scenarios(args):
+    generator, client_ids, open_tasks, sizes = sample(args)
+    manager = login(args.manager, args.password)
+    worker = login(args.worker, args.password)
+    task_ids = list(open_tasks)
+
+    def toggle_status():
+        # Moves one of the worker's open tasks between Assigned and In Progress.
+        task_id = generator.choice(task_ids)
+        status = open_tasks[task_id] = 'Assigned' if open_tasks[task_id] == 'In Progress' else 'In Progress'
+        return worker.post('/update_task_status', json={'task_id': task_id, 'status': status})
+
+    runs = {
+        'kanban_board (manager)': (args.requests, lambda: manager.get('/kanban_board')),
+        'kanban_board (worker)': (args.requests, lambda: worker.get('/kanban_board')),
+        'manager_dashboard': (args.requests, lambda: manager.get('/manager_dashboard')),
+        'client_profile': (args.requests, lambda: manager.get(f'/client/{generator.choice(client_ids)}')),
+        'update_task_status': (args.requests, toggle_status),
+        'task_list (manager)': (args.requests, lambda: manager.get('/tasks')),
+        'task_list (worker)': (args.requests, lambda: worker.get('/tasks')),
+    }
+    for rule in sorted(app.url_map.iter_rules(), key=lambda rule: rule.rule):
+        if not rule.endpoint.startswith('main.download_'):
+            continue
+        name = rule.endpoint.split('.', 1)[1] + (' (per client)' if 'client_id' in rule.arguments else '')
+
+        def download(rule=rule):
+            values = {'client_id': generator.choice(client_ids)} if 'client_id' in rule.arguments else {}
+            with app.test_request_context():
+                path = app.url_for(rule.endpoint, **values)
+            return manager.get(path)
+
+        runs[name] = (args.download_requests, download)
+    return runs, sizes
+
+
+def measure(request, count):
+    queries = []
+    with app.app_context():
+        engine = db.engine
+
+    def counter(*arguments):
+        queries[-1] += 1
+
+    event.listen(engine, 'before_cursor_execute', counter)
+    timings = []
+    statuses = set()
+    try:
+        for _ in range(count):
+            queries.append(0)
+            start = time.perf_counter()
+            response = request()
+            response.get_data()  # exports stream, so read the whole body
+            timings.append((time.perf_counter() - start) * 1000)
+            statuses.add(response.status_code)
+    finally:
+        event.remove(engine, 'before_cursor_execute', counter)
+    result = {'requests': count, 'statuses': sorted(statuses), 'mean_ms': round(sum(timings) / count, 2),
+              'queries': round(sum(queries) / count, 1), 'max_queries': max(queries)}
+    for p in PERCENTILES:
+        result[f'p{p}_ms'] = round(percentile(timings, p), 2)
+    return result
+
+
+def commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_results(results, baseline=None):
+    for name, result in results.items():
+        line = (f'{name:40} p50 {result["p50_ms"]:9.2f} ms  p95 {result["p95_ms"]:9.2f} ms  '
+                f'p99 {result["p99_ms"]:9.2f} ms  {result["queries"]:6.1f} queries')
+        before = (baseline or {}).get(name)
+        if before:
+            change = (result['p95_ms'] - before['p95_ms']) / before['p95_ms'] * 100 if before['p95_ms'] else 0
+            line += f'  p95 {change:+6.1f}%  queries {result["queries"] - before["queries"]:+.1f}'
+        if result['statuses'] != [200]:
+            line += f'  statuses {result["statuses"]}'
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=50)
+    parser.add_argument('--download-requests', type=int, default=3)
+    parser.add_argument('--only', action='append', help='Run only the scenarios whose name contains this (repeatable)')
+    parser.add_argument('--manager', default='manager1@example.com')
+    parser.add_argument('--worker', default='worker1@example.com')
+    parser.add_argument('--password', default=PASSWORD)
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--output', help='Write the results to this JSON file')
+    parser.add_argument('--compare', help='An earlier --output file to compare against')
+    args = parser.parse_args()
+    app.config['WTF_CSRF_ENABLED'] = False
+
+    runs, sizes = scenarios(args)
+    results = {}
+    for name, (count, request) in runs.items():
+        if args.only and not any(part in name for part in args.only):
+            continue
+        request()  # warm up caches and the connection pool
+        results[name] = measure(request, count)
+    baseline = None
+    if args.compare:
+        with open(args.compare) as stream:
+            baseline = json.load(stream)['scenarios']
+    print_results(results, baseline)
+    if args.output:
+        with open(args.output, 'w') as stream:
+            json.dump({'commit': commit(), 'run_at': datetime.now(timezone.utc).isoformat(),
+                       'tables': sizes, 'scenarios': results}, stream, indent=2)
+
+
+if __name__ == '__main__':
+    main()
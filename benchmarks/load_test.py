@@ -0,0 +1,155 @@
+"""Throughput of a running server under concurrent clients.
+
+    DATABASE_URI=sqlite:////tmp/agency.sqlite gunicorn -c gunicorn.conf.py wsgi:app
+    python benchmarks/load_test.py --url http://127.0.0.1:8000 --concurrency 1 4 16
+
+Each simulated client logs in over HTTP (half as managers, half as the
+first workers of ``flask generate-data``) and for ``--duration`` seconds
+keeps requesting the Kanban board, dashboards, a client profile, the task
+list and, for workers, ``update_task_status`` on one of their open tasks.
+Requests per second and p50/p95/p99 latency are printed for every
+concurrency level and, with ``--output``, saved as JSON.
+"""
+import argparse
+import http.cookiejar
+import json
+import random
+import re
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+PASSWORD = 'benchmark'  # app.sample_data.PASSWORD; not imported so that this runs without the app
+CSRF_INPUT = re.compile(r'name="csrf_token"[^>]*value="([^"]+)"')
+CSRF_META = re.compile(r'<meta name="csrf-token" content="([^"]+)"')
+
+
+def percentile(timings, p):
+    ordered = sorted(timings)
+    return ordered[min(len(ordered) - 1, max(0, round(p / 100 * len(ordered) + 0.5) - 1))]
+
+
+class Client:
+    def __init__(self, base_url, email, password, generator):
+        self.base_url = base_url.rstrip('/')
+        self.generator = generator
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()))
+        login_page = self.request('GET', '/login')[1]
+        form = {'email': email, 'password': password, 'csrf_token': CSRF_INPUT.search(login_page).group(1)}
+        status, page = self.request('POST', '/login', urllib.parse.urlencode(form).encode(),
+                                    {'Content-Type': 'application/x-www-form-urlencoded'})
+        match = CSRF_META.search(page)
+        if 'Login Unsuccessful' in page or not match:
+            raise SystemExit(f'could not log in as {email}')
+        self.csrf_token = match.group(1)
+        self.is_manager = email.startswith('manager')
+        self.client_ids = [item['id'] for item in self.get_json('/clients?format=json&limit=200')['items']]
+        self.open_tasks = {}
+        if not self.is_manager:
+            for status in ('Assigned', 'In Progress'):
+                for task in self.get_json(f'/kanban_board/{urllib.parse.quote(status)}.json?limit=200')['tasks']:
+                    self.open_tasks[task['id']] = task['status']
+
+    def request(self, method, path, body=None, headers=None):
+        request = urllib.request.Request(self.base_url + path, data=body, method=method, headers=headers or {})
+        try:
+            with self.opener.open(request, timeout=60) as response:
+                return response.status, response.read().decode()
+        except urllib.error.HTTPError as error:
+            return error.code, error.read().decode()
+
+    def get_json(self, path):
+        return json.loads(self.request('GET', path)[1])
+
+    def actions(self):
+        actions = [('kanban_board', lambda: self.request('GET', '/kanban_board')),
+                   ('task_list', lambda: self.request('GET', '/tasks'))]
+        if self.client_ids:
+            actions.append(('client_profile', lambda: self.request('GET', f'/client/{self.generator.choice(self.client_ids)}')))
+        if self.is_manager:
+            actions.append(('manager_dashboard', lambda: self.request('GET', '/manager_dashboard')))
+        else:
+            actions.append(('worker_dashboard', lambda: self.request('GET', '/worker_dashboard')))
+            if self.open_tasks:
+                actions.append(('update_task_status', self.toggle_status))
+        return actions
+
+    def toggle_status(self):
+        task_id = self.generator.choice(list(self.open_tasks))
+        status = self.open_tasks[task_id] = 'Assigned' if self.open_tasks[task_id] == 'In Progress' else 'In Progress'
+        body = json.dumps({'task_id': task_id, 'status': status}).encode()
+        return self.request('POST', '/update_task_status', body,
+                            {'Content-Type': 'application/json', 'X-CSRFToken': self.csrf_token})
+
+
+def run(args, concurrency):
+    clients = []
+    for number in range(concurrency):
+        role = 'manager' if number % 2 else 'worker'
+        clients.append(Client(args.url, f'{role}{number // 2 + 1}@example.com', args.password, random.Random(number)))
+
+    timings = {}
+    errors = []
+    lock = threading.Lock()
+    deadline = time.monotonic() + args.duration
+
+    def work(client):
+        actions = client.actions()
+        while time.monotonic() < deadline:
+            name, action = client.generator.choice(actions)
+            start = time.perf_counter()
+            status, _ = action()
+            elapsed = (time.perf_counter() - start) * 1000
+            with lock:
+                timings.setdefault(name, []).append(elapsed)
+                if status >= 400:
+                    errors.append((name, status))
+
+    threads = [threading.Thread(target=work, args=(client,)) for client in clients]
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+
+    every = [timing for values in timings.values() for timing in values]
+    result = {'concurrency': concurrency, 'requests': len(every), 'errors': len(errors),
+              'requests_per_second': round(len(every) / elapsed, 1), 'routes': {}}
+    for name, values in [('all', every)] + sorted(timings.items()):
+        summary = {'requests': len(values)}
+        for p in (50, 95, 99):
+            summary[f'p{p}_ms'] = round(percentile(values, p), 2)
+        if name == 'all':
+            result.update(summary)
+        else:
+            result['routes'][name] = summary
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', default='http://127.0.0.1:8000')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 4, 16])
+    parser.add_argument('--duration', type=float, default=30)
+    parser.add_argument('--password', default=PASSWORD)
+    parser.add_argument('--output', help='Write the results to this JSON file')
+    args = parser.parse_args()
+
+    results = []
+    for concurrency in args.concurrency:
+        result = run(args, concurrency)
+        results.append(result)
+        print(f'{concurrency:3} clients  {result["requests_per_second"]:8.1f} req/s  p50 {result["p50_ms"]:8.2f} ms  '
+              f'p95 {result["p95_ms"]:8.2f} ms  p99 {result["p99_ms"]:8.2f} ms  {result["errors"]} errors')
+        for name, summary in result['routes'].items():
+            print(f'      {name:20} p50 {summary["p50_ms"]:8.2f} ms  p95 {summary["p95_ms"]:8.2f} ms  ({summary["requests"]} requests)')
+    if args.output:
+        with open(args.output, 'w') as stream:
+            json.dump(results, stream, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+"""Time full-text search queries against a synthetic index.
+
+    python benchmarks/search_benchmark.py --rows 1000000
+    python benchmarks/search_benchmark.py --backend memory --rows 100000
+
+The FTS5 index is built in a temporary SQLite file (or ``--database``,
+reused if it already holds enough rows), then every query is run
+``--repeat`` times and its median and p95 latency are printed.
+"""
+import argparse
+import itertools
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from sqlalchemy import create_engine, text  # noqa: E402
+from app.search import FTS_TABLE, InvertedIndex, KINDS, create_fts_table, fts_search, fts_write  # noqa: E402
+
+# Specific words, a prefix and two-term queries; queries() adds the most common word of
+# the corpus and the start of it, the slowest kind of query.
+QUERIES = ['bakery', 'bak', 'instagram growth', 'reel', 'launch campaign', 'coffee roast']
+
+
+def words(seed, size=5000):
+    generator = random.Random(seed)
+    letters = 'abcdefghijklmnopqrstuvwxyz'
+    vocabulary = [''.join(generator.choice(letters) for _ in range(generator.randint(3, 9))) for _ in range(size)]
+    return vocabulary + ['bakery', 'instagram', 'growth', 'reel', 'launch', 'campaign', 'coffee', 'roastery']
+
+
+def queries(seed=7):
+    common = words(seed)[0]
+    return QUERIES + [common, common[:-1]]
+
+
+def documents(rows, seed=7):
+    generator = random.Random(seed)
+    vocabulary = words(seed)
+    # Zipf-like: a few words are everywhere, most are rare.
+    weights = list(itertools.accumulate(1 / (rank + 1) for rank in range(len(vocabulary))))
+    for ref in range(1, rows + 1):
+        title = ' '.join(generator.choices(vocabulary, cum_weights=weights, k=generator.randint(2, 6)))
+        body = ' '.join(generator.choices(vocabulary, cum_weights=weights, k=generator.randint(5, 30)))
+        yield KINDS[ref % len(KINDS)], ref, title, body
+
+
+def timed(search, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        hits = search()
+        timings.append((time.perf_counter() - start) * 1000)
+    return hits, timings
+
+
+def report(name, hits, timings):
+    p95 = statistics.quantiles(timings, n=20)[-1] if len(timings) > 1 else timings[0]
+    print(f'{name:24} {len(hits):3} hits  p50 {statistics.median(timings):7.2f} ms  p95 {p95:7.2f} ms')
+
+
+def run_fts5(args):
+    path = args.database or os.path.join(tempfile.mkdtemp(), 'search.sqlite')
+    engine = create_engine(f'sqlite:///{path}')
+    with engine.begin() as connection:
+        create_fts_table(connection)
+        existing = connection.execute(text(f'SELECT count(*) FROM {FTS_TABLE}')).scalar()
+    if existing < args.rows:
+        start = time.perf_counter()
+        batch = []
+        with engine.begin() as connection:
+            connection.execute(text(f'DELETE FROM {FTS_TABLE}'))
+            for entry in documents(args.rows):
+                batch.append(entry)
+                if len(batch) == 10000:
+                    fts_write(connection, batch, replace=False)
+                    batch = []
+            fts_write(connection, batch, replace=False)
+            connection.execute(text(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('optimize')"))
+        print(f'indexed {args.rows} rows into {path} in {time.perf_counter() - start:.1f}s')
+    with engine.connect() as connection:
+        for query in queries():
+            report(query, *timed(lambda: fts_search(connection, query, limit=args.limit), args.repeat))
+
+
+def run_memory(args):
+    index = InvertedIndex()
+    start = time.perf_counter()
+    for entry in documents(args.rows):
+        index.add(*entry)
+    print(f'indexed {args.rows} rows in memory in {time.perf_counter() - start:.1f}s')
+    for query in queries():
+        report(query, *timed(lambda: index.search(query, limit=args.limit), args.repeat))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--backend', choices=('fts5', 'memory'), default='fts5')
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--repeat', type=int, default=50)
+    parser.add_argument('--limit', type=int, default=20)
+    parser.add_argument('--database', help='SQLite file to build the FTS5 index in (default: a temporary file)')
+    args = parser.parse_args()
+    (run_fts5 if args.backend == 'fts5' else run_memory)(args)
+
+
+if __name__ == '__main__':
+    main()
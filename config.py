@@ -4,10 +4,116 @@ import os
 # Load environment variables from .env file
 load_dotenv()
 
-print(f"SECRET_KEY: {os.getenv('SECRET_KEY')}")
-print(f"DATABASE_URI: {os.getenv('DATABASE_URI')}")
+
+def database_uri():
+    uri = os.getenv('DATABASE_URI', 'sqlite:///db.sqlite')
+    # Some hosts still hand out postgres:// URLs, which SQLAlchemy no longer accepts.
+    return 'postgresql://' + uri[len('postgres://'):] if uri.startswith('postgres://') else uri
+
+
+def engine_options(uri):
+    """Connection pool settings from the DB_POOL_* environment variables."""
+    options = {
+        'pool_pre_ping': os.getenv('DB_POOL_PRE_PING', 'true').lower() in ('1', 'true', 'yes'),
+        'pool_recycle': int(os.getenv('DB_POOL_RECYCLE', 1800)),
+    }
+    # In-memory SQLite gets a single shared connection from Flask-SQLAlchemy, not a sized pool.
+    if uri not in ('sqlite://', 'sqlite:///:memory:'):
+        options.update(
+            pool_size=int(os.getenv('DB_POOL_SIZE', 10)),
+            max_overflow=int(os.getenv('DB_MAX_OVERFLOW', 20)),
+            pool_timeout=int(os.getenv('DB_POOL_TIMEOUT', 30)),
+        )
+    return options
+
 
 class Config:
     SECRET_KEY = 'Test'  # Replace with the key you generated
-    SQLALCHEMY_DATABASE_URI = 'sqlite:///db.sqlite'
+    SQLALCHEMY_DATABASE_URI = database_uri()
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options(SQLALCHEMY_DATABASE_URI)
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    MIGRATIONS_ENABLED = True  # Flask-Migrate, for the flask db commands
+    # Applied to every new SQLite connection (app/database.py): WAL lets readers carry on
+    # while a request writes, and writers wait up to the busy timeout instead of failing.
+    SQLITE_JOURNAL_MODE = os.getenv('SQLITE_JOURNAL_MODE', 'WAL')
+    SQLITE_SYNCHRONOUS = os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL')
+    SQLITE_BUSY_TIMEOUT_MS = int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', 5000))
+    KANBAN_PAGE_SIZE = 50
+    KANBAN_MAX_PAGE_SIZE = 200
+    TASK_BATCH_MAX_MOVES = 500
+    CLIENT_SECTION_PAGE_SIZE = 25
+    CLIENT_SECTION_MAX_PAGE_SIZE = 200
+    LIST_PAGE_SIZE = 50
+    LIST_MAX_PAGE_SIZE = 200
+    # 'fts5', 'memory' or 'auto' (FTS5 when the search_index table exists); see app/search.py.
+    SEARCH_BACKEND = os.getenv('SEARCH_BACKEND', 'auto')
+    SEARCH_PAGE_SIZE = 20
+    SEARCH_MAX_PAGE_SIZE = 100
+    REPORT_WEEKS = 12  # default window of the submitted tasks report; 0 for all time
+    # Unread badge cache; set the backend to a redis:// URL to share it between worker processes.
+    UNREAD_COUNT_CACHE_BACKEND = os.getenv('UNREAD_COUNT_CACHE_BACKEND')
+    UNREAD_COUNT_CACHE_SIZE = 10000
+    UNREAD_COUNT_CACHE_TTL = 300
+    # Worker and client lists behind the assign task typeahead; see app/choices.py.
+    CHOICES_CACHE_TTL = 300
+    CHOICES_PAGE_SIZE = 20
+    CHOICES_MAX_PAGE_SIZE = 100
+    USER_CACHE_SIZE = 10000
+    USER_CACHE_TTL = 300
+    MANAGER_IDS_CACHE_TTL = 60
+    # 'inline' writes notifications in the request, 'queue' hands them to a background
+    # worker after commit and 'outbox' also persists them until the worker delivers them.
+    NOTIFICATION_DELIVERY = os.getenv('NOTIFICATION_DELIVERY', 'queue')
+    NOTIFICATION_QUEUE_WORKERS = 1
+    NOTIFICATION_QUEUE_BATCH_SIZE = 500
+    NOTIFICATION_QUEUE_MAX_ATTEMPTS = 10  # after which an undeliverable event is logged and dropped
+    NOTIFICATION_MARK_MAX_IDS = 1000  # ids per bulk mark-as-read request
+    NOTIFICATION_QUEUE_METRICS_HOOK = None  # 'module:function', called with queue depth and drain latency
+    # Read notifications older than the retention are archived (or deleted), and runs of at
+    # least DIGEST_MIN unread ones of a type older than DIGEST_DAYS become one digest; see app/retention.py.
+    NOTIFICATION_RETENTION_DAYS = int(os.getenv('NOTIFICATION_RETENTION_DAYS', 90))
+    NOTIFICATION_RETENTION_MODE = os.getenv('NOTIFICATION_RETENTION_MODE', 'archive')
+    NOTIFICATION_DIGEST_DAYS = int(os.getenv('NOTIFICATION_DIGEST_DAYS', 14))
+    NOTIFICATION_DIGEST_MIN = 5
+    NOTIFICATION_RETENTION_BATCH_SIZE = 1000
+    NOTIFICATION_RETENTION_PAUSE = 0.05  # seconds between batches
+    NOTIFICATION_RETENTION_INTERVAL = 3600  # seconds between scheduled runs; 0 to disable
+    # Overdue and due-soon alerts for open tasks, see app/deadlines.py.
+    DEADLINE_CHECK_INTERVAL = 300  # seconds between scheduled runs; 0 to disable
+    DEADLINE_DUE_SOON_HOURS = 24
+    DEADLINE_BATCH_SIZE = 500
+    # Runs the periodic jobs in this process (app/scheduler.py); enable it in one process only.
+    SCHEDULER_ENABLED = os.getenv('SCHEDULER_ENABLED', '').lower() in ('1', 'true', 'yes')
+    STREAM_HEARTBEAT_SECONDS = 15
+    STREAM_MAX_QUEUE = 100
+    # Open /stream connections per process, each holding a thread; keep it below WEB_THREADS
+    # (gunicorn.conf.py) so that ordinary requests always have threads left.
+    STREAM_MAX_CONNECTIONS = int(os.getenv('STREAM_MAX_CONNECTIONS', 48))
+    # A redis:// URL shares /stream messages between worker processes; see app/events.py.
+    STREAM_BROKER_BACKEND = os.getenv('STREAM_BROKER_BACKEND')
+    STREAM_BROKER_CHANNEL = 'stream'
+    EXPORT_BATCH_SIZE = 1000
+    EXPORT_CHUNK_SIZE = 64 * 1024
+    EXPORT_GZIP = True
+    METRICS_IMPORT_BATCH_SIZE = 5000
+    METRICS_PARQUET_ROW_GROUP_SIZE = 50000
+    # Per-request query/time profiling, logged on app.perf and shown at /__perf; see app/perf.py.
+    PERF_ENABLED = os.getenv('PERF_ENABLED', '').lower() in ('1', 'true', 'yes')
+    PERF_QUERY_THRESHOLD = int(os.getenv('PERF_QUERY_THRESHOLD', 20))
+    PERF_SLOWEST_STATEMENTS = 5
+    PERF_HISTORY = 50
+
+
+class TestConfig(Config):
+    # A private in-memory database per app, so parallel test workers never share state.
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options('sqlite://')
+    WTF_CSRF_ENABLED = False
+    MIGRATIONS_ENABLED = False
+    NOTIFICATION_DELIVERY = 'inline'
+    UNREAD_COUNT_CACHE_BACKEND = None
+    STREAM_BROKER_BACKEND = None
+    PERF_ENABLED = False
+    SCHEDULER_ENABLED = False
+    NOTIFICATION_RETENTION_PAUSE = 0
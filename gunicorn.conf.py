@@ -0,0 +1,18 @@
+# gunicorn -c gunicorn.conf.py wsgi:app
+import os
+
+bind = os.getenv('BIND', '0.0.0.0:8000')
+# One process by default: the /stream broker, the unread counts and the caches live in the
+# process, so more workers need STREAM_BROKER_BACKEND and UNREAD_COUNT_CACHE_BACKEND set to Redis.
+workers = int(os.getenv('WEB_CONCURRENCY', 1))
+# Threaded workers: every open /stream connection holds one thread for as long as the page is
+# open, up to STREAM_MAX_CONNECTIONS (48) of them; the remaining threads serve everything else.
+# WEB_WORKER_CLASS=gevent (pip install gevent) holds thousands of streams instead.
+worker_class = os.getenv('WEB_WORKER_CLASS', 'gthread')
+threads = int(os.getenv('WEB_THREADS', 64))
+keepalive = 5
+timeout = 60
+graceful_timeout = 30
+# The app starts background threads (the notification queue) at import, which must not be forked.
+preload_app = False
+accesslog = os.getenv('ACCESS_LOG', '-')
@@ -0,0 +1,49 @@
+"""Add client created_at and keyset pagination indexes
+
+Revision ID: 3b8e1f0c7d92
+Revises: f29efe86651e
+Create Date: 2024-07-19 10:12:44.508213
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3b8e1f0c7d92'
+down_revision = 'f29efe86651e'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('client', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('created_at', sa.DateTime(), nullable=True))
+
+    # The lists seek on (created_at, id), which skips rows with a NULL created_at.
+    op.execute('UPDATE client SET created_at = CURRENT_TIMESTAMP WHERE created_at IS NULL')
+    op.execute('UPDATE task SET created_at = COALESCE(in_progress_time, completion_time, CURRENT_TIMESTAMP) '
+               'WHERE created_at IS NULL')
+
+    with op.batch_alter_table('client', schema=None) as batch_op:
+        batch_op.create_index('ix_client_created_at_id', ['created_at', 'id'], unique=False)
+        batch_op.create_index('ix_client_user_id_created_at_id', ['user_id', 'created_at', 'id'], unique=False)
+
+    with op.batch_alter_table('task', schema=None) as batch_op:
+        batch_op.create_index('ix_task_created_at_id', ['created_at', 'id'], unique=False)
+        batch_op.create_index('ix_task_deadline_id', ['deadline', 'id'], unique=False)
+        batch_op.create_index('ix_task_status_created_at_id', ['status', 'created_at', 'id'], unique=False)
+        batch_op.create_index('ix_task_worker_id_created_at_id', ['worker_id', 'created_at', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('task', schema=None) as batch_op:
+        batch_op.drop_index('ix_task_worker_id_created_at_id')
+        batch_op.drop_index('ix_task_status_created_at_id')
+        batch_op.drop_index('ix_task_deadline_id')
+        batch_op.drop_index('ix_task_created_at_id')
+
+    with op.batch_alter_table('client', schema=None) as batch_op:
+        batch_op.drop_index('ix_client_user_id_created_at_id')
+        batch_op.drop_index('ix_client_created_at_id')
+        batch_op.drop_column('created_at')
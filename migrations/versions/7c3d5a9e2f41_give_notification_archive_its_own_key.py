@@ -0,0 +1,52 @@
+"""Give the notification archive its own primary key
+
+Revision ID: 7c3d5a9e2f41
+Revises: b91d4e2c7f05
+Create Date: 2024-08-07 09:41:18.506273
+
+The archive was keyed on the notification's id, which the database hands
+out again once the notification table no longer holds it, so archiving a
+second notification with the same id failed. The table is rebuilt with a
+surrogate key and the original id in ``notification_id``.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7c3d5a9e2f41'
+down_revision = 'b91d4e2c7f05'
+branch_labels = None
+depends_on = None
+
+COLUMNS = 'user_id, message, type, timestamp, read'
+
+
+def _create(*key_columns):
+    op.create_table('notification_archive',
+    *key_columns,
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('message', sa.String(length=250), nullable=True),
+    sa.Column('type', sa.String(length=50), nullable=True),
+    sa.Column('timestamp', sa.DateTime(), nullable=True),
+    sa.Column('read', sa.Boolean(), nullable=True),
+    )
+
+
+def upgrade():
+    op.rename_table('notification_archive', 'notification_archive_old')
+    _create(sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('notification_id', sa.Integer(), nullable=False))
+    op.execute(f'INSERT INTO notification_archive (notification_id, {COLUMNS}) '
+               f'SELECT id, {COLUMNS} FROM notification_archive_old ORDER BY id')
+    op.drop_table('notification_archive_old')
+
+
+def downgrade():
+    # The old key can only hold one row per notification id; keep the latest archived.
+    op.rename_table('notification_archive', 'notification_archive_new')
+    _create(sa.Column('id', sa.Integer(), autoincrement=False, primary_key=True))
+    op.execute(f'INSERT INTO notification_archive (id, {COLUMNS}) '
+               f'SELECT notification_id, {COLUMNS} FROM notification_archive_new WHERE id IN '
+               f'(SELECT max(id) FROM notification_archive_new GROUP BY notification_id)')
+    op.drop_table('notification_archive_new')
@@ -0,0 +1,41 @@
+"""Add full-text search index
+
+Revision ID: 9d41c6a2b7e5
+Revises: 3b8e1f0c7d92
+Create Date: 2024-07-22 14:31:08.772190
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9d41c6a2b7e5'
+down_revision = '3b8e1f0c7d92'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # FTS5 is SQLite only; other databases use the in-memory index of app/search.py.
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    op.execute("CREATE VIRTUAL TABLE search_index USING fts5("
+               "kind UNINDEXED, title, body, tokenize='unicode61 remove_diacritics 2', prefix='3')")
+    # rowid = id * 3 + position of the kind in app.search.SOURCES.
+    op.execute("INSERT INTO search_index (rowid, kind, title, body) "
+               "SELECT id * 3, 'client', COALESCE(name, ''), "
+               "COALESCE(business_category, '') || ' ' || COALESCE(social_media_handles, '') || ' ' || COALESCE(goals, '') "
+               "FROM client")
+    op.execute("INSERT INTO search_index (rowid, kind, title, body) "
+               "SELECT id * 3 + 1, 'task', COALESCE(task_description, ''), COALESCE(completion_description, '') "
+               "FROM task")
+    op.execute("INSERT INTO search_index (rowid, kind, title, body) "
+               "SELECT id * 3 + 2, 'content_idea', COALESCE(description, ''), COALESCE(idea_source, '') "
+               "FROM content_idea")
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    op.execute('DROP TABLE search_index')
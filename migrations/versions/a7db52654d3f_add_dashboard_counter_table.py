@@ -0,0 +1,51 @@
+"""Add dashboard counter table
+
+Revision ID: a7db52654d3f
+Revises: 84570d106ad0
+Create Date: 2024-07-14 10:12:41.503218
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a7db52654d3f'
+down_revision = '84570d106ad0'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('dashboard_counter',
+    sa.Column('worker_id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('assigned', sa.Integer(), nullable=False),
+    sa.Column('in_progress', sa.Integer(), nullable=False),
+    sa.Column('completed', sa.Integer(), nullable=False),
+    sa.Column('active_clients', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('worker_id')
+    )
+
+    # Seed the counters from the existing rows; `flask rebuild-counters` does the same at any time.
+    op.execute("""
+        INSERT INTO dashboard_counter (worker_id, assigned, in_progress, completed, active_clients)
+        SELECT 0,
+               COALESCE(SUM(CASE WHEN status = 'Assigned' THEN 1 ELSE 0 END), 0),
+               COALESCE(SUM(CASE WHEN status = 'In Progress' THEN 1 ELSE 0 END), 0),
+               COALESCE(SUM(CASE WHEN status = 'Completed' THEN 1 ELSE 0 END), 0),
+               (SELECT COUNT(*) FROM client WHERE status = 'Active')
+        FROM task
+    """)
+    op.execute("""
+        INSERT INTO dashboard_counter (worker_id, assigned, in_progress, completed, active_clients)
+        SELECT worker_id,
+               SUM(CASE WHEN status = 'Assigned' THEN 1 ELSE 0 END),
+               SUM(CASE WHEN status = 'In Progress' THEN 1 ELSE 0 END),
+               SUM(CASE WHEN status = 'Completed' THEN 1 ELSE 0 END),
+               0
+        FROM task GROUP BY worker_id
+    """)
+
+
+def downgrade():
+    op.drop_table('dashboard_counter')
@@ -0,0 +1,64 @@
+"""Add parsed post date to Metric
+
+Revision ID: f29efe86651e
+Revises: 52bd5304dfc6
+Create Date: 2024-07-18 11:27:53.904172
+
+"""
+from datetime import datetime
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f29efe86651e'
+down_revision = '52bd5304dfc6'
+branch_labels = None
+depends_on = None
+
+# Formats seen in the free-text post_date column, tried in order (day-first before month-first).
+POST_DATE_FORMATS = ('%Y-%m-%d', '%d/%m/%Y', '%m/%d/%Y', '%d-%m-%Y', '%Y/%m/%d', '%d.%m.%Y',
+                     '%d %b %Y', '%d %B %Y', '%b %d, %Y', '%B %d, %Y', '%d/%m/%y')
+BATCH_SIZE = 5000
+
+
+def parse_post_date(value):
+    value = (value or '').strip()
+    for candidate in (value, value[:10]):
+        for date_format in POST_DATE_FORMATS:
+            try:
+                return datetime.strptime(candidate, date_format).date()
+            except ValueError:
+                continue
+    return None
+
+
+def upgrade():
+    with op.batch_alter_table('metric', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('posted_on', sa.Date(), nullable=True))
+        batch_op.create_index('ix_metric_client_id_posted_on', ['client_id', 'posted_on'], unique=False)
+
+    # Backfill in id order and in batches so large tables are never held in memory.
+    connection = op.get_bind()
+    metric = sa.table('metric', sa.column('id', sa.Integer), sa.column('post_date', sa.String), sa.column('posted_on', sa.Date))
+    last_id = 0
+    while True:
+        rows = connection.execute(
+            sa.select(metric.c.id, metric.c.post_date).where(metric.c.id > last_id).order_by(metric.c.id).limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+        parsed = [{'metric_id': row.id, 'posted_on': parse_post_date(row.post_date)} for row in rows]
+        parsed = [row for row in parsed if row['posted_on'] is not None]
+        if parsed:
+            connection.execute(
+                metric.update().where(metric.c.id == sa.bindparam('metric_id')).values(posted_on=sa.bindparam('posted_on')),
+                parsed,
+            )
+
+
+def downgrade():
+    with op.batch_alter_table('metric', schema=None) as batch_op:
+        batch_op.drop_index('ix_metric_client_id_posted_on')
+        batch_op.drop_column('posted_on')
@@ -0,0 +1,22 @@
+import pytest
+from app import create_app, db
+from app.query_plans import VIEW_REQUESTS, check_query_plans, view_statements
+
+
+@pytest.fixture
+def app():
+    app = create_app('config.TestConfig')
+    with app.app_context():
+        db.create_all()
+        yield app
+
+
+def test_views_issue_queries(app):
+    # A request that errors out before querying would pass the plan check with nothing to explain.
+    for name, request in VIEW_REQUESTS.items():
+        assert view_statements(*request), name
+
+
+def test_no_hot_query_scans_a_whole_table(app):
+    plans, offenders = check_query_plans()
+    assert offenders == [], {name: plans[name] for name in offenders}
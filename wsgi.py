@@ -0,0 +1,11 @@
+"""Production entry point: ``gunicorn -c gunicorn.conf.py wsgi:app`` (or ``waitress-serve wsgi:app``)."""
+from app import create_app
+
+app = create_app()
+
+if __name__ == '__main__':
+    # No gunicorn (e.g. on Windows): fall back to waitress if it is installed.
+    import os
+    from waitress import serve
+    serve(app, host=os.getenv('HOST', '0.0.0.0'), port=int(os.getenv('PORT', 8000)),
+          threads=int(os.getenv('WEB_THREADS', 64)))